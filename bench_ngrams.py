@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+
+"""
+bench_ngrams.py
+
+This is a benchmark suite for gen_ngrams.py and gen2_ngrams.py. It runs gen_ngrams.gen_skippy_ngrams(..), gen_ngrams.gen_extended_skippy_ngrams(..) and gen2_ngrams.gen_skippy_ngrams(..) over the bundled data/words and data/phrases files and over synthetic inputs of growing length, sweeping n, max_gap_size (or max_distance, where None leaves spans unrestricted), extended and inclusive. It reports time, peak memory and output counts per case, saves the results as JSON, and compares them with a saved run to detect regressions.
+
+Usage
+python bench_ngrams.py -o bench.json
+python bench_ngrams.py -o bench-new.json --compare bench.json
+
+Creation
+2026/10/17
+"""
+
+import gen_ngrams
+import gen2_ngrams
+
+##
+def load_docs(path: str, pattern: str, max_docs: int, min_len: int, max_len: int) -> list:
+
+    """
+    reads a data file and returns up to max_docs lists of segments, each truncated to max_len segments.
+    Lines shorter than min_len segments are skipped, so that all cases go through the main path of generation.
+    """
+
+    docs = [ ]
+    with open(path, encoding = "utf-8") as f:
+        for line in f:
+            segs = gen2_ngrams.segment(line.strip(), pattern)
+            if len(segs) >= min_len:
+                docs.append(segs[:max_len])
+            if len(docs) >= max_docs:
+                break
+    return docs
+
+##
+def gen_synthetic_docs(length: int, n_docs: int = 10, n_types: int = 8) -> list:
+
+    """
+    returns n_docs lists of segments of a given length drawn from n_types types, with a fixed seed
+    """
+
+    import random
+    rng = random.Random(length)
+    return [ [ f"s{rng.randrange(n_types)}" for _ in range(length) ] for _ in range(n_docs) ]
+
+##
+def gen_cases(n_values: list, gap_values: list):
+
+    """
+    yields (name, function, parameters) of the generators to benchmark
+    """
+
+    for n in n_values:
+        for gap in gap_values:
+            yield "gen_ngrams.gen_skippy_ngrams", lambda d, n = n, gap = gap: gen_ngrams.gen_skippy_ngrams(d, n, max_distance = gap), dict(n = n, max_distance = gap)
+            yield "gen_ngrams.gen_extended_skippy_ngrams", lambda d, n = n, gap = gap: gen_ngrams.gen_extended_skippy_ngrams(d, n, max_distance = gap), dict(n = n, max_distance = gap)
+            for extended in (False, True):
+                for inclusive in (False, True):
+                    yield "gen2_ngrams.gen_skippy_ngrams", lambda d, n = n, gap = gap, extended = extended, inclusive = inclusive: gen2_ngrams.gen_skippy_ngrams(d, n, max_gap_size = gap, extended = extended, inclusive = inclusive), dict(n = n, max_gap_size = gap, extended = extended, inclusive = inclusive)
+
+##
+def run_case(f, docs: list, repeat: int = 3) -> dict:
+
+    """
+    runs f over docs and returns the best time of repeat runs, the peak memory of one traced run and the output count.
+    template_cache is cleared before every run, so that every run pays for compiling templates.
+    """
+
+    import time, tracemalloc
+    best = None
+    for _ in range(repeat):
+        gen2_ngrams.template_cache.clear()
+        start = time.perf_counter()
+        count = sum( len(f(d)) for d in docs )
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    ## memory is traced separately, since tracing slows the run down
+    gen2_ngrams.template_cache.clear()
+    tracemalloc.start()
+    for d in docs:
+        f(d)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return { "time": best, "peak_memory": peak, "count": count }
+
+##
+def run_benchmarks(quick: bool = False, repeat: int = 3, check: bool = False) -> list:
+
+    """
+    runs all cases over all inputs and returns a list of result records
+    """
+
+    import pathlib
+    data_dir = pathlib.Path(__file__).parent / "data"
+    if quick:
+        max_docs, lengths, n_values, gap_values = 20, [ 4, 8 ], [ 2, 3 ], [ 2, 4, None ]
+    else:
+        max_docs, lengths, n_values, gap_values = 100, [ 4, 8, 12, 16 ], [ 1, 2, 3, 4 ], [ 1, 2, 4, 8, None ]
+    min_len = max(n_values)
+    inputs = [
+        ("words", load_docs(data_dir / "words" / "buddhist-listed2.txt", r"", max_docs, min_len, 12)),
+        ("phrases", load_docs(data_dir / "phrases" / "austen-j-sample100.txt", r"\s+", max_docs, min_len, 12)),
+    ]
+    inputs.extend( (f"synthetic-{length}", gen_synthetic_docs(length)) for length in lengths if length >= min_len )
+
+    ##
+    R = [ ]
+    for input_name, docs in inputs:
+        for name, f, params in gen_cases(n_values, gap_values):
+            r = dict(input = input_name, function = name, **params)
+            r.update(run_case(f, docs, repeat = repeat))
+            if check:
+                print(r)
+            R.append(r)
+    return R
+
+##
+def make_case_key(r: dict) -> tuple:
+
+    """
+    returns a key that identifies a case across runs
+    """
+
+    return tuple( (k, r[k]) for k in sorted(r) if k not in ("time", "peak_memory", "count") )
+
+##
+def compare_results(R: list, B: list, threshold: float = 1.5) -> list:
+
+    """
+    compares results R with baseline results B and returns messages on cases slower than threshold times, or with changed counts
+    """
+
+    base = { make_case_key(b): b for b in B }
+    M = [ ]
+    for r in R:
+        b = base.get(make_case_key(r))
+        if b is None:
+            continue
+        case = ", ".join( f"{k} = {v}" for k, v in make_case_key(r) )
+        if r["count"] != b["count"]:
+            M.append(f"count changed from {b['count']} to {r['count']}: {case}")
+        if b["time"] > 0 and r["time"] / b["time"] > threshold:
+            M.append(f"{r['time'] / b['time']:.2f} times slower: {case}")
+        if b["peak_memory"] > 0 and r["peak_memory"] / b["peak_memory"] > threshold:
+            M.append(f"{r['peak_memory'] / b['peak_memory']:.2f} times more memory: {case}")
+    return M
+
+##
+def main():
+
+    import argparse, json, platform
+    parser = argparse.ArgumentParser(description = "benchmarks generators of skippy n-grams")
+    parser.add_argument("-o", "--output", default = "bench_output.json", help = "file to save results in")
+    parser.add_argument("-c", "--compare", default = None, help = "results of an earlier run to compare with")
+    parser.add_argument("-t", "--threshold", type = float, default = 1.5, help = "ratio to report as a regression")
+    parser.add_argument("-r", "--repeat", type = int, default = 3)
+    parser.add_argument("--quick", action = "store_true", help = "run a small subset of cases")
+    parser.add_argument("--check", action = "store_true")
+    args = parser.parse_args()
+
+    ##
+    R = run_benchmarks(quick = args.quick, repeat = args.repeat, check = args.check)
+    for r in R:
+        params = ", ".join( f"{k} = {v}" for k, v in r.items() if k not in ("input", "function", "time", "peak_memory", "count") )
+        print(f"{r['input']:>14} {r['function']:<38} {params:<58} {r['time'] * 1000:10.2f} ms {r['peak_memory'] / 1024:10.1f} KiB {r['count']:8d}")
+    with open(args.output, "w", encoding = "utf-8") as f:
+        json.dump({ "python": platform.python_version(), "results": R }, f, indent = 1)
+    print(f"#saved results in {args.output}")
+
+    ##
+    if args.compare is not None:
+        with open(args.compare, encoding = "utf-8") as f:
+            B = json.load(f)["results"]
+        M = compare_results(R, B, threshold = args.threshold)
+        for m in M:
+            print(f"#regression: {m}")
+        if len(M) == 0:
+            print(f"#no regressions against {args.compare}")
+
+##
+if __name__ == "__main__":
+    main()
+
+### end of file
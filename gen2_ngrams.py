@@ -17,25 +17,128 @@ Modifications
 2025/08/26 fixed bugs in filtering of p from P, where non-extended cases are treated as extended ones;
 2025/08/28 implemented a better solution to mishandling of n_for_ngram in recursion;
 2025/08/29 fixed bugs of seg duplication, overgenerate segs and settled on release 1;
+2026/10/17 replaced the product lattice in gen_skippy_ngrams(..) with index templates of valid n-grams only, now iter_skippy_templates(..);
+2026/10/17 introduced make_key(..) for hashed dedup in make_unique(..), filter_segs(..) and gen_skippy_ngrams(..);
+2026/10/17 added lazy iter_ngrams(..) and iter_skippy_ngrams(..), on which the list-returning functions are built;
+2026/10/17 added gen_skippy_ngrams_corpus(..) and iter_skippy_ngrams_corpus(..) to process documents in a process pool;
+2026/10/17 added gen_skippy_ngrams_upto(..) to generate all orders up to a given n in one pass;
+2026/10/17 added make_vocab(..), encode_segs(..) and decode_ngram(..) and vocab option to emit n-grams as tuples of ids;
+2026/10/17 added count_skippy_ngrams(..) and corpus-level counting with spill to sorted runs on disk;
+2026/10/17 added NgramCache, an LRU cache for gen_skippy_ngrams(..) with hit/miss statistics;
+2026/10/17 added compile_skippy_templates(..), which caches index templates per input length and parameters;
+2026/10/17 made template_cache keep templates per span, i.e., compile_span_templates(..), rather than per input length;
+2026/10/17 added GenStats to collect counters and timings, with instrumentation kept out of the plain code paths;
+2026/10/17 added cli(..), a streaming command-line entry point with TSV/JSONL output;
+2026/10/17 added GenBudget to bound candidates, output and time per call and per corpus, with skip, truncate and window policies;
+2026/10/17 added Segmenter, which compiles a pattern once and normalizes, casefolds and splits texts in one pass;
+2026/10/17 added iter_skippy_ngram_occurrences(..), which yields the positions of every occurrence of skippy n-grams;
+2026/10/17 added Ngram, a compact n-gram of positions in a shared document rendered on demand, and as_ngram option;
+2026/10/17 added gen_char_skippy_ngrams(..), a character-level fast path taken by gen_skippy_ngrams(.., sep = "");
+2026/10/17 added iter_skippy_ngrams_windowed(..), which streams occurrences in long sequences through a sliding window;
+2026/10/17 factored dedup and removal of overgenerated n-grams into select_skippy_ngrams(..) and is_overgenerated(..);
+2026/10/17 made iter_skippy_indices(..) and gen_skippy_indices(..) aliases of iter_skippy_templates(..) and compile_skippy_templates(..), which mark gaps by -1;
 """
 
+##
+class Segmenter:
+
+    """
+    a reusable segmenter that compiles pattern once and, in a single pass over a text, applies Unicode normalization
+    (e.g., "NFC", or None for none), lowercasing or casefolding, splitting by pattern and removal of empty segments.
+    Call it on a text to get its segments, or use segment_lines(..) and segment_file(..) to feed the generators in batches.
+    It can be passed as pattern wherever documents are segmented, e.g., to gen_skippy_ngrams_corpus(..).
+    """
+
+    def __init__(self, pattern: str = r"", normalization: str = None, lowercase: bool = False, casefold: bool = False):
+        import re
+        self.pattern = pattern
+        self.normalization = normalization
+        self.lowercase = lowercase
+        self.casefold = casefold
+        ## characters and whitespace need no regex; other literal patterns are split by str.split(..)
+        if pattern == "":
+            self.split = list
+        elif pattern in (r"\s+", r"\s"):
+            self.split = str.split
+        elif re.escape(pattern) == pattern:
+            self.split = lambda t: t.split(pattern)
+        else:
+            self.split = re.compile(pattern).split
+
+    def normalize(self, t: str) -> str:
+        """returns a text normalized as the segmenter does before splitting it"""
+        if self.normalization is not None:
+            import unicodedata
+            t = unicodedata.normalize(self.normalization, t)
+        if self.casefold:
+            t = t.casefold()
+        elif self.lowercase:
+            t = t.lower()
+        return t
+
+    def __call__(self, t: str) -> list:
+        return [ x for x in self.split(self.normalize(t)) if len(x) > 0 ]
+
+    def segment_lines(self, lines, skip_empty: bool = True):
+        """yields segments of lines one by one, skipping lines with no segments if skip_empty"""
+        for line in lines:
+            segs = self(line.rstrip("\r\n"))
+            if len(segs) > 0 or not skip_empty:
+                yield segs
+
+    def segment_file(self, path: str, skip_empty: bool = True, encoding: str = "utf-8"):
+        """yields segments of lines of a file one by one, streaming the file"""
+        with open(path, encoding = encoding) as f:
+            yield from self.segment_lines(f, skip_empty = skip_empty)
+
+    def __getstate__(self):
+        ## split may be a lambda, so it is rebuilt on unpickling, e.g., in worker processes
+        return (self.pattern, self.normalization, self.lowercase, self.casefold)
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+## segmenters of plain patterns, compiled once per pattern
+segmenters = { }
+
+##
+def get_segmenter(pattern = r"") -> Segmenter:
+
+    """
+    returns pattern itself if it is a Segmenter, or otherwise a cached Segmenter of the regex pattern
+    """
+
+    if isinstance(pattern, Segmenter):
+        return pattern
+    S = segmenters.get(pattern)
+    if S is None:
+        S = segmenters[pattern] = Segmenter(pattern)
+    return S
+
 ##
 def segment(t: str, pattern: str = r"", as_tuple: bool = False):
 
-    import re
+    """
+    returns the non-empty segments of t split by pattern, a regex or a Segmenter
+    """
+
     if as_tuple:
-        return ( x for x in re.split(pattern, t) if len(x) > 0 )
+        return ( x for x in get_segmenter(pattern)(t) )
     else:
-        return [ x for x in re.split(pattern, t) if len(x) > 0 ]
+        return get_segmenter(pattern)(t)
 
 def make_unique(L:list):
 
     """
     convert a list into another where no duplicates are allowed.
+    the original order is kept, and lists are compared by their hashed tuple form.
     """
     M = [ ]
+    seen = set()
     for x in L:
-        if not x in M:
+        key = tuple(x) if type(x) is list else x
+        if not key in seen:
+            seen.add(key)
             M.append(x)
     return M
 
@@ -92,6 +195,14 @@ def simplify_gaps(segs: list, gap_mark: str, verbose: bool = False, check: bool
     simplifies repeated gap_marks in compliance to the definition of extended skippiness
     """
 
+    ## fast path without any check in the loop
+    if not check:
+        R = [ ]
+        for seg in segs:
+            if seg != gap_mark or len(R) == 0 or R[-1] != gap_mark:
+                R.append(seg)
+        return R
+
     ##
     if check:
         print(f"input segs: {segs}")
@@ -123,6 +234,20 @@ def simplify_gaps(segs: list, gap_mark: str, verbose: bool = False, check: bool
         print(f"#R: {R}")
     return R
 
+##
+def make_key(segs: list, gap_mark: str = "…") -> tuple:
+
+    """
+    returns a hashable canonical key of a segment sequence, where repeated gap_marks are simplified
+    """
+
+    K = [ ]
+    for seg in segs:
+        if seg == gap_mark and len(K) > 0 and K[-1] == gap_mark:
+            continue
+        K.append(seg)
+    return tuple(K)
+
 ##
 def remove_gaps(segs: list, gap_mark: str):
 
@@ -131,12 +256,287 @@ def remove_gaps(segs: list, gap_mark: str):
     return [ seg for seg in segs if seg != gap_mark ]
 
 ##
-def filter_segs(subsegs_pool: list, n_for_ngram: int, max_gap_size: int, extended: bool = True, inclusive: bool = True, gap_mark: str = "…", verbose: bool = False, check: bool = False):
+class GenStats:
+
+    """
+    collects counters and per-stage timings of generation. Pass one as stats to gen_skippy_ngrams(..)
+    or iter_skippy_ngrams(..); without it, the instrumented code paths are not taken at all.
+    Counters are candidates, rejected_* (one per filter rule), dedup_hits, overgenerated (removals), kept,
+    short_inputs and cache_hits/cache_misses; timings are in seconds per stage.
+    If callback is given, it is called with (name, value) on every update.
+    """
+
+    def __init__(self, callback = None):
+        import collections
+        self.counters = collections.Counter()
+        self.timings = collections.Counter()
+        self.callback = callback
+
+    def count(self, name: str, k: int = 1):
+        self.counters[name] += k
+        if self.callback is not None:
+            self.callback(name, k)
+
+    def add_time(self, stage: str, seconds: float):
+        self.timings[stage] += seconds
+        if self.callback is not None:
+            self.callback(stage, seconds)
+
+    def merge(self, other):
+        self.counters.update(other.counters)
+        self.timings.update(other.timings)
+
+    def as_dict(self) -> dict:
+        return { "counters": dict(self.counters), "timings": dict(self.timings) }
+
+##
+class GenBudget:
+
+    """
+    limits resources of generation per call and per corpus, and reports the documents that hit a limit.
+    Pass one as budget to gen_skippy_ngrams(..), gen_ngrams.gen_skippy_ngrams(..) or the corpus functions.
+    Per call, max_candidates bounds the number of position templates (counted before any work),
+    max_output the number of n-grams and max_time the seconds spent. When a call exceeds a limit, policy decides:
+    "skip" returns nothing, "truncate" cuts the input at the end (for candidates) or the output (for output and time),
+    and "window" narrows the span of skippy n-grams, i.e., max_gap_size or max_distance, so as to fit max_candidates,
+    and cuts the input as "truncate" does if the narrowest span does not fit. Both generators take the policies so.
+    Per corpus, max_corpus_candidates, max_corpus_output and max_corpus_time bound the totals,
+    after which every call is skipped. Hits are kept in hits as dicts with doc, reason and the action taken,
+    where cuts of the input add n_segs kept (and the narrowed span).
+    """
+
+    policies = ("skip", "truncate", "window")
+
+    def __init__(self, max_candidates: int = None, max_output: int = None, max_time: float = None, policy: str = "truncate", max_corpus_candidates: int = None, max_corpus_output: int = None, max_corpus_time: float = None):
+        assert policy in self.policies, f"policy must be one of {self.policies}"
+        self.max_candidates = max_candidates
+        self.max_output = max_output
+        self.max_time = max_time
+        self.policy = policy
+        self.max_corpus_candidates = max_corpus_candidates
+        self.max_corpus_output = max_corpus_output
+        self.max_corpus_time = max_corpus_time
+        self.doc = None
+        self.doc_of_call = None
+        self.n_calls = 0
+        self.totals = { "candidates": 0, "output": 0, "time": 0.0 }
+        self.hits = [ ]
+
+    def begin(self, n_candidates: int) -> str:
+        """
+        starts a call of n_candidates and returns None to go ahead, or the action to take on it
+        """
+        import time
+        self.start_time = time.perf_counter()
+        if self.doc is None:
+            self.doc_of_call = self.n_calls
+        else:
+            self.doc_of_call = self.doc
+        self.n_calls += 1
+        name = self.corpus_exceeded()
+        if name is not None:
+            self.record(f"corpus_{name}", "skip", n_candidates = n_candidates)
+            return "skip"
+        if self.max_candidates is not None and n_candidates > self.max_candidates:
+            self.record("candidates", self.policy, n_candidates = n_candidates)
+            return self.policy
+        return None
+
+    def corpus_exceeded(self) -> str:
+        """
+        returns the name of the per-corpus limit that the totals have reached, or None
+        """
+        T = self.totals
+        for name, limit in (("candidates", self.max_corpus_candidates), ("output", self.max_corpus_output), ("time", self.max_corpus_time)):
+            if limit is not None and T[name] >= limit:
+                return name
+        return None
+
+    def has_corpus_limits(self) -> bool:
+        """
+        tells if any per-corpus limit is set
+        """
+        return not (self.max_corpus_candidates is None and self.max_corpus_output is None and self.max_corpus_time is None)
+
+    def for_worker(self):
+        """
+        returns a budget with the per-call limits only, for a worker process whose totals are merged into this one
+        """
+        return GenBudget(self.max_candidates, self.max_output, self.max_time, policy = self.policy)
+
+    def exceeded(self, n_output: int) -> str:
+        """
+        returns the name of the per-call limit that n_output items so far exceed, or None
+        """
+        import time
+        if self.max_output is not None and n_output >= self.max_output:
+            return "output"
+        if self.max_time is not None and time.perf_counter() - self.start_time > self.max_time:
+            return "time"
+        return None
+
+    def end(self, n_candidates: int, n_output: int):
+        """
+        adds a finished call to the totals
+        """
+        import time
+        self.totals["candidates"] += n_candidates
+        self.totals["output"] += n_output
+        self.totals["time"] += time.perf_counter() - self.start_time
+
+    def record(self, reason: str, action: str, **info):
+        """
+        adds a hit of the current call, or of the document given as doc in info
+        """
+        hit = dict(doc = self.doc_of_call, reason = reason, action = action)
+        hit.update(info)
+        self.hits.append(hit)
+
+    def merge(self, other):
+        for name in self.totals:
+            self.totals[name] += other.totals[name]
+        self.hits.extend(other.hits)
+
+    def report(self) -> list:
+        return list(self.hits)
+
+## id reserved for gap_mark in a vocabulary
+GAP_ID = 0
+
+##
+def make_vocab(gap_mark: str = "…") -> dict:
+
+    """
+    returns an empty vocabulary, i.e., a dict from segments to integer ids, where gap_mark has GAP_ID.
+    A vocabulary grows as it encodes segments, and can be shared across documents of a corpus.
+    """
+
+    return { gap_mark: GAP_ID }
+
+##
+def encode_segs(segs: list, vocab: dict) -> tuple:
+
+    """
+    converts segments into a tuple of integer ids, adding unknown segments to vocab
+    """
+
+    return tuple( vocab.setdefault(seg, len(vocab)) for seg in segs )
+
+##
+def invert_vocab(vocab: dict) -> list:
+
+    """
+    returns a list that maps ids back to segments
+    """
+
+    I = [ None ] * len(vocab)
+    for seg, i in vocab.items():
+        I[i] = seg
+    return I
+
+##
+def decode_ngram(ids: tuple, inverted_vocab: list, sep: str = " ", as_list: bool = False):
+
+    """
+    converts a tuple of ids back to an n-gram, joined by sep unless as_list = True;
+    inverted_vocab is given by invert_vocab(..)
+    """
+
+    segs = [ inverted_vocab[i] for i in ids ]
+    if as_list:
+        return segs
+    else:
+        return sep.join(segs)
+
+##
+class NgramSource:
+
+    """
+    segments of a document shared by its Ngram objects, with gap_mark appended so that position -1 gives a gap
+    """
+
+    __slots__ = ("segs", "sep")
+
+    def __init__(self, segs: list, gap_mark: str = "…", sep: str = " "):
+        self.segs = tuple(segs) + (gap_mark,)
+        self.sep = sep
+
+##
+class Ngram:
+
+    """
+    a compact n-gram given by gen_ngrams(.., as_ngram = True) and gen_skippy_ngrams(.., as_ngram = True):
+    a reference to the segments of its document and a tuple of positions, where -1 stands for a gap.
+    It hashes and compares by its segments without building strings, and is rendered to the string form,
+    joined by sep of the generation, by str(..) or render(..) only on demand.
+    """
+
+    __slots__ = ("source", "positions")
+
+    def __init__(self, source: NgramSource, positions: tuple):
+        self.source = source
+        self.positions = positions
+
+    @property
+    def key(self) -> tuple:
+        """the tuple of segments (and gap_marks)"""
+        return tuple(map(self.source.segs.__getitem__, self.positions))
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __iter__(self):
+        return map(self.source.segs.__getitem__, self.positions)
+
+    def __hash__(self) -> int:
+        return hash(self.key)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Ngram):
+            return NotImplemented
+        if self.source is other.source and self.positions == other.positions:
+            return True
+        return self.key == other.key
+
+    def render(self, sep: str = None) -> str:
+        """returns the n-gram joined by sep, or by sep of the generation"""
+        return (self.source.sep if sep is None else sep).join(self)
+
+    def as_list(self) -> list:
+        return list(self)
+
+    def get_segment_positions(self) -> tuple:
+        """returns the positions of segments in the document, gaps excluded"""
+        return tuple( j for j in self.positions if j >= 0 )
+
+    def __str__(self) -> str:
+        return self.render()
+
+    def __repr__(self) -> str:
+        return f"Ngram({self.render()!r})"
+
+##
+def make_ngram(segs: list, sep: str = " ", gap_mark: str = "…") -> Ngram:
+
+    """
+    returns an Ngram of a list of segments (and gap_marks) on a source of its own, for n-grams with no positions in a document
+    """
+
+    return Ngram(NgramSource(segs, gap_mark, sep), tuple( -1 if seg == gap_mark else j for j, seg in enumerate(segs) ))
+
+##
+def filter_segs(subsegs_pool: list, n_for_ngram: int, max_gap_size: int, extended: bool = True, inclusive: bool = True, gap_mark: str = "…", verbose: bool = False, stats: GenStats = None, check: bool = False):
+
+    """
+    the filter of the product lattice of release 1, which tries every combination of segments and gap_marks of each
+    subsegs in subsegs_pool; gen_skippy_ngrams(..) no longer uses it but builds valid templates only, so it is kept
+    as the reference implementation, e.g., for test_gen2_ngrams.py
+    """
 
     if check and verbose:
         print(f"#max_gap_size: {max_gap_size}")
     import itertools
-    Q = [ ]; xQ = [ ] # checker of iso-forms
+    Q = [ ]; xQ = set() # checker of iso-forms
     for i, subsegs in enumerate(subsegs_pool):
         if check:
             print(f"#{i} subsegs: {subsegs}")
@@ -152,10 +552,15 @@ def filter_segs(subsegs_pool: list, n_for_ngram: int, max_gap_size: int, extende
             n_segs = len(segs)
             n_elements = count_elements(segs, gap_mark)
             n_gaps = count_gaps(segs, gap_mark)
-            xsegs = simplify_gaps(segs, gap_mark = gap_mark, check = check)
+            xsegs = make_key(segs, gap_mark = gap_mark)
+
+            if stats is not None:
+                stats.count("candidates")
 
             ## exclude sequences of gap_markers
             if n_elements == 0:
+                if stats is not None:
+                    stats.count("rejected_no_element")
                 if check:
                     print(f"#ignored: {segs} [n_elements: {n_elements} == 0]\n...")
                 continue
@@ -163,12 +568,16 @@ def filter_segs(subsegs_pool: list, n_for_ngram: int, max_gap_size: int, extende
             ## excludes segs longer then max_gap_size
             pad = 2
             if n_segs > max_gap_size + pad:
+                if stats is not None:
+                    stats.count("rejected_span")
                 if check:
                     print(f"#ignored: {segs} [n_segs: {n_segs} > max_gap_size: {max_gap_size}]\n...")
                 continue
 
             ## excludes if count_elements(p) > n_for_ngram
             if n_elements > n_for_ngram:
+                if stats is not None:
+                    stats.count("rejected_too_many")
                 if check:
                     print(f"#ignored: {segs} [n_elements: {n_elements} > n_for_ngram: {n_for_ngram}]\n...")
                 continue
@@ -178,6 +587,8 @@ def filter_segs(subsegs_pool: list, n_for_ngram: int, max_gap_size: int, extende
                 pass
             else:
                 if n_elements < n_for_ngram:
+                    if stats is not None:
+                        stats.count("rejected_exclusive")
                     if check:
                         print(f"#ignored: {segs} [n_elements: {n_elements} < n_for_ngram: {n_for_ngram}]\n...")
                     continue
@@ -185,6 +596,8 @@ def filter_segs(subsegs_pool: list, n_for_ngram: int, max_gap_size: int, extende
             ## select by extendedness
             if extended:
                 if n_elements == 1 and n_gaps == 0:
+                    if stats is not None:
+                        stats.count("rejected_unigram")
                     if check:
                         print(f"#ignored: {segs} [n_elements == 1 or n_gaps == 0]\n...")
                     continue
@@ -193,24 +606,29 @@ def filter_segs(subsegs_pool: list, n_for_ngram: int, max_gap_size: int, extende
                     pass
             else: # complicated selection for segs
                 if segs[0] != gap_mark or segs[-1] != gap_mark:
-                    if segs not in Q and xsegs not in xQ:
+                    if xsegs not in xQ:
                         Q.append(segs)
-                        xQ.append(xsegs)
+                        xQ.add(xsegs)
                 elif segs[0] == gap_mark or segs[-1] == gap_mark:
                     if n_elements == 1:
-                        if not segs in Q and not xsegs in xQ:
+                        if not xsegs in xQ:
                             Q.append(segs)
-                            xQ.append(xsegs)
+                            xQ.add(xsegs)
                     else:
+                        if stats is not None:
+                            stats.count("rejected_edge_gap")
                         if check:
                             print(f"#ignored: {segs} [segs[0] or segs[-1] == gap_mark]\n...")
                         continue
             ##
             if check:
                 print(f"#xsegs: {xsegs}")
-            if not segs in Q and not xsegs in xQ:
+            ## segs in Q implies xsegs in xQ, so the key alone decides
+            if not xsegs in xQ:
                 Q.append(segs)
-                xQ.append(xsegs)
+                xQ.add(xsegs)
+            elif stats is not None:
+                stats.count("dedup_hits")
     ##
     if check and verbose:
         print(f"#xQ [size: {len(xQ)}]: {xQ}")
@@ -218,64 +636,510 @@ def filter_segs(subsegs_pool: list, n_for_ngram: int, max_gap_size: int, extende
         print(f"#Q [size: {len(Q)}]: {Q}")
     return Q
 
+##
+def is_overgenerated(key, Q, gap) -> bool:
+
+    """
+    tells if a key extended by a gap at either end is in a collection Q of keys, where gap is (gap_mark,) for tuples
+    of segments or ids, and gap_mark for strings. Such a key is overgenerated and removed from skippy n-grams.
+    """
+
+    return key + gap in Q or gap + key in Q
+
+##
+def select_skippy_ngrams(keys, xQ: set, gap, items = None, stats: GenStats = None, verbose: bool = False, check: bool = False):
+
+    """
+    takes keys of templates in order, with xQ, the set of all of them, and yields each at its first occurrence unless
+    it is overgenerated, or the item paired with it if items are given. xQ is emptied as keys are yielded;
+    a key extended by a gap never occurs earlier than the key itself, so it is still in xQ when the key is checked.
+    """
+
+    pairs = zip(keys, items) if items is not None else ( (key, key) for key in keys )
+    if stats is None and not check:
+        for key, item in pairs:
+            if key not in xQ:
+                continue
+            xQ.remove(key)
+            if key + gap in xQ or gap + key in xQ:
+                continue
+            yield item
+        return
+
+    ## the same with counters and prints
+    for key, item in pairs:
+        if key not in xQ:
+            if stats is not None:
+                stats.count("dedup_hits")
+            if check and verbose:
+                print(f"#ignored q: {key}")
+            continue
+        xQ.remove(key)
+        if key + gap in xQ or gap + key in xQ:
+            if stats is not None:
+                stats.count("overgenerated")
+            if check:
+                print(f"#removed {key}")
+            continue
+        if stats is not None:
+            stats.count("kept")
+        if check:
+            print(f"#kept: {key}")
+        yield item
+
+##
+def walk_span_offsets(chosen: list, start: int, stop: int, k: int, n_for_ngram: int, R: list):
+
+    """
+    collects combinations of offsets in a span of size k in the order of itertools.product(..) over [seg, gap_mark],
+    i.e., depth-first with a combination emitted after all of its extensions
+    """
+
+    for r in range(start, stop):
+        ## prune branches that can no longer end at k - 1 or k - 2
+        if len(chosen) + 1 == n_for_ngram and r < k - 2:
+            continue
+        chosen.append(r)
+        if len(chosen) < n_for_ngram:
+            walk_span_offsets(chosen, r + 1, k, k, n_for_ngram, R)
+        if r >= k - 2:
+            R.append(tuple(chosen))
+        chosen.pop()
+
+##
+def compile_span_templates(k: int, n_for_ngram: int, extended: bool = True, inclusive: bool = True) -> tuple:
+
+    """
+    returns (templates, counters) of a span of k segments that starts at position 0, where templates are tuples
+    of offsets in which -1 stands for a gap, and counters are those of the filter rules per start position.
+    They depend on neither the input length nor max_gap_size, so they are compiled once and kept in template_cache.
+    """
+
+    key = (k, n_for_ngram, extended, inclusive)
+    R = template_cache.get(key)
+    if R is not None:
+        return R
+
+    ## offsets of segments in a span of size k, allowing a single leading or trailing gap at most
+    C = [ ]
+    walk_span_offsets([ ], 0, min(k, 2), k, n_for_ngram, C)
+    counters = GenStats()
+    counters.count("candidates", len(C))
+    S = [ ]
+    for c in C:
+        n_elements = len(c)
+        if not inclusive and n_elements < n_for_ngram:
+            counters.count("rejected_exclusive")
+            continue
+        lead = c[0] == 1
+        trail = c[-1] == k - 2
+        if extended:
+            ## unigrams with no gaps are excluded
+            if n_elements == 1 and k == 1:
+                counters.count("rejected_unigram")
+                continue
+        else:
+            ## gaps at the ends are dropped later, which only duplicates a shorter span
+            if lead or trail:
+                counters.count("rejected_edge_gap")
+                continue
+        s = [ ]
+        if lead:
+            s.append(-1)
+        for j, r in enumerate(c):
+            if j > 0 and r > c[j - 1] + 1:
+                s.append(-1)
+            s.append(r)
+        if trail:
+            s.append(-1)
+        S.append(tuple(s))
+    R = (tuple(S), tuple(counters.counters.items()))
+    template_cache.put(key, R)
+    return R
+
+##
+def get_max_span(n_segs: int, max_gap_size: int = None) -> int:
+
+    """
+    returns the longest span of a template: a segment sequence (gaps included) cannot be longer than max_gap_size + 2
+    """
+
+    pad = 2
+    if max_gap_size is None:
+        return n_segs
+    return min(n_segs, max_gap_size + pad)
+
+##
+def iter_skippy_templates(n_segs: int, n_for_ngram: int, max_gap_size: int = None, extended: bool = True, inclusive: bool = True, stats: GenStats = None):
+
+    """
+    yields index templates of skippy n-grams over a sequence of n_segs segments one by one, by span, start position
+    and the templates of compile_span_templates(..). A template is a tuple of segment positions in which -1 stands for a (simplified) gap.
+    """
+
+    for k in range(1, get_max_span(n_segs, max_gap_size) + 1):
+        S, C = compile_span_templates(k, n_for_ngram, extended = extended, inclusive = inclusive)
+        n_starts = n_segs - k + 1
+        if stats is not None:
+            for name, c in C:
+                stats.count(name, c * n_starts)
+        for i in range(n_starts):
+            for s in S:
+                yield tuple( -1 if r < 0 else i + r for r in s )
+
+##
+def iter_skippy_keys(segs: list, n_for_ngram: int, max_gap_size: int = None, extended: bool = True, inclusive: bool = True, gap_mark: str = "…", stats: GenStats = None):
+
+    """
+    yields the keys, i.e., tuples of segments and gap_marks, of the templates of iter_skippy_templates(..) over segs
+    in the same order. Keys are gathered from a window per span and start position, without building templates.
+    """
+
+    segs = list(segs)
+    n_segs = len(segs)
+    for k in range(1, get_max_span(n_segs, max_gap_size) + 1):
+        S, C = compile_span_templates(k, n_for_ngram, extended = extended, inclusive = inclusive)
+        n_starts = n_segs - k + 1
+        if stats is not None:
+            for name, c in C:
+                stats.count(name, c * n_starts)
+        for i in range(n_starts):
+            window = segs[i : i + k]
+            window.append(gap_mark)
+            gather = window.__getitem__
+            for s in S:
+                yield tuple(map(gather, s))
+
 ##
 ## Beware to make recursively = True. it procudes extra strings;
-def gen_ngrams (S: list, n_for_ngram: int, inclusive: bool = False, recursively: bool = False, sep: str = " ", as_list: bool = False, check: bool = False):
+def gen_ngrams (S: list, n_for_ngram: int, inclusive: bool = False, recursively: bool = False, sep: str = " ", as_list: bool = False, vocab: dict = None, as_ngram: bool = False, check: bool = False):
 
     """
     takes a list S of segments and returns a list R of n-grams out of them.
+    With vocab given by make_vocab(..), n-grams are tuples of integer ids.
+    With as_ngram = True, n-grams are Ngram objects, which are rendered to strings only on demand.
     """
 
     assert n_for_ngram > 0
+    assert not (as_ngram and vocab is not None), "as_ngram and vocab cannot be used together"
     if check:
         print(f"#S: {S}")
 
     ##
     segs = [ seg for seg in S if len(seg) > 0 ]
+    if len(segs) < n_for_ngram and vocab is not None:
+        G = gen_ngrams(segs, n_for_ngram, inclusive = inclusive, recursively = recursively, sep = sep, as_list = True, check = check)
+        return [ encode_segs(g, vocab) for g in G ]
     if len(segs) < n_for_ngram:
         if recursively:
-            G = gen_ngrams(segs, n_for_ngram - 1, inclusive = inclusive, recursively = recursively, sep = sep, as_list = as_list, check = check)
+            G = gen_ngrams(segs, n_for_ngram - 1, inclusive = inclusive, recursively = recursively, sep = sep, as_list = as_list, as_ngram = as_ngram, check = check)
             G = make_unique(G)
-            if as_list:
+            if as_list or as_ngram:
                 return G
             else:
                 return [ sep.join(segs) for segs in G ]
         else:
+            if as_ngram:
+                return [ Ngram(NgramSource(segs, sep = sep), tuple(range(len(segs)))) ]
             if as_list:
                 return [ segs ]
             else:
                 return [ sep.join(segs) ]
 
     ## main
-    R = [ ]
+    return list(iter_ngrams(segs, n_for_ngram, inclusive = inclusive, recursively = recursively, sep = sep, as_list = as_list, vocab = vocab, as_ngram = as_ngram))
+
+##
+def iter_ngrams(S: list, n_for_ngram: int, inclusive: bool = False, recursively: bool = False, sep: str = " ", as_list: bool = False, vocab: dict = None, as_ngram: bool = False, check: bool = False):
+
+    """
+    takes a list S of segments and yields n-grams out of them one by one, as gen_ngrams(..) returns them.
+    """
+
+    assert n_for_ngram > 0
+    if check:
+        print(f"#S: {S}")
+
+    ##
+    segs = [ seg for seg in S if len(seg) > 0 ]
+    if len(segs) < n_for_ngram:
+        ## short inputs yield a few items only
+        yield from gen_ngrams(segs, n_for_ngram, inclusive = inclusive, recursively = recursively, sep = sep, as_list = as_list, vocab = vocab, as_ngram = as_ngram, check = check)
+        return
+
+    ## encode segments once, so that n-grams are slices of ids
+    if vocab is not None:
+        segs = encode_segs(segs, vocab)
+
+    ## main
     if inclusive:
-        for j in range(1, n_for_ngram + 1):
-            for i in range(len(segs)):
-                try:
-                    gram = segs[i : i + j] # get an n-gram
-                    if len(gram) == j:
-                        R.append(gram)
-                except IndexError:
-                    pass
+        sizes = range(1, n_for_ngram + 1)
     else:
-        for i in range(len(segs)):
-            try:
-                gram = segs[i : i + n_for_ngram] # get an n-gram
-                if len(gram) == n_for_ngram:
-                    R.append(gram)
-            except IndexError:
-                pass
+        sizes = [ n_for_ngram ]
+    if sep == "" and not (as_list or as_ngram) and vocab is None and all( len(seg) == 1 for seg in segs ):
+        ## characters are sliced out of the string
+        text = "".join(segs)
+        for j in sizes:
+            for i in range(len(text) - j + 1):
+                yield text[i : i + j]
+        return
+    if as_ngram:
+        source = NgramSource(segs, sep = sep)
+        for j in sizes:
+            for i in range(len(segs) - j + 1):
+                yield Ngram(source, tuple(range(i, i + j)))
+        return
+    for j in sizes:
+        for i in range(len(segs) - j + 1):
+            gram = segs[i : i + j] # get an n-gram
+            if as_list or vocab is not None:
+                yield gram
+            else:
+                yield sep.join(gram)
+
+##
+class NgramCache:
+
+    """
+    a bounded LRU cache of generated n-grams, keyed on a segment tuple and all generation parameters.
+    It can be passed as cache to gen_skippy_ngrams(..) in any number of calls, and thus shared across corpora.
+    """
+
+    def __init__(self, max_size: int = 100000):
+        import collections
+        self.max_size = max_size
+        self.items = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple):
+        """returns the cached value of key, or None on a miss"""
+        try:
+            value = self.items[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self.items.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: tuple, value):
+        """stores a value, evicting the least recently used items beyond max_size"""
+        self.items[key] = value
+        self.items.move_to_end(key)
+        while len(self.items) > self.max_size:
+            self.items.popitem(last = False)
+
+    def clear(self):
+        self.items.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        return { "hits": self.hits, "misses": self.misses, "size": len(self.items), "max_size": self.max_size }
+
+## templates of spans shared by all inputs, whatever their lengths
+template_cache = NgramCache(max_size = 1024)
+
+##
+def compile_skippy_templates(n_segs: int, n_for_ngram: int, max_gap_size: int = None, extended: bool = True, inclusive: bool = True, stats: GenStats = None) -> tuple:
+
+    """
+    returns the index templates of iter_skippy_templates(..) as a tuple, where a gap is -1 so that
+    a template gathers gap_mark from segments with gap_mark appended. The tuple is as large as the output,
+    so it is built for callers that need templates at random only; the others iterate over them.
+    """
+
+    return tuple(iter_skippy_templates(n_segs, n_for_ngram, max_gap_size, extended = extended, inclusive = inclusive, stats = stats))
+
+## aliases of the names of earlier revisions
+iter_skippy_indices = iter_skippy_templates
+gen_skippy_indices = compile_skippy_templates
+
+##
+def count_skippy_templates(n_segs: int, n_for_ngram: int, max_gap_size: int = None, extended: bool = True, inclusive: bool = True) -> int:
+
+    """
+    returns the number of position templates of compile_skippy_templates(..) over n_segs segments without enumerating them.
+    In a span of size k, the first segment is at offset 0 or 1 (after a leading gap) and the last at k - 1 or k - 2
+    (before a trailing gap), and any combination of the offsets in between completes a template.
+    """
+
+    import math
+    K = n_segs if max_gap_size is None else min(n_segs, max_gap_size + 2)
+    m = 0
+    for k in range(1, K + 1):
+        c = 0
+        for first in (0, 1):
+            for last in (k - 2, k - 1):
+                if last < first:
+                    continue
+                if not extended and (first == 1 or last == k - 2):
+                    continue
+                if first == last:
+                    if (inclusive or n_for_ngram == 1) and not (extended and k == 1):
+                        c += 1
+                else:
+                    for j in range(n_for_ngram - 1):
+                        if inclusive or j + 2 == n_for_ngram:
+                            c += math.comb(last - first - 1, j)
+        m += (n_segs - k + 1) * c
+    return m
+
+##
+def fit_skippy_budget(n_segs: int, n_for_ngram: int, max_gap_size: int, extended: bool, inclusive: bool, max_candidates: int, policy: str) -> tuple:
+
+    """
+    returns (n_segs, max_gap_size) reduced so that count_skippy_templates(..) fits max_candidates:
+    "window" narrows max_gap_size first, down to 1, and both policies then cut segments at the end
+    """
+
+    if policy == "window":
+        if max_gap_size is None or max_gap_size > n_segs - 2:
+            max_gap_size = max(1, n_segs - 2)
+        while max_gap_size > 1 and count_skippy_templates(n_segs, n_for_ngram, max_gap_size, extended, inclusive) > max_candidates:
+            max_gap_size -= 1
+    ## the estimate grows with n_segs, so the longest fitting input is found by bisection
+    lo, hi = 0, n_segs
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count_skippy_templates(mid, n_for_ngram, max_gap_size, extended, inclusive) <= max_candidates:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo, max_gap_size
+
+##
+def gen_skippy_ngrams_in_budget(base_segs: list, n_for_ngram: int, budget: GenBudget, max_gap_size: int = None, extended: bool = True, inclusive: bool = True, recursively: bool = True, sep: str = " ", gap_mark: str = "…", vocab: dict = None, stats: GenStats = None, as_ngram: bool = False, check: bool = False) -> list:
+
+    """
+    returns skippy n-grams of iter_skippy_ngrams(.., as_list = True) within the limits of a budget.
+    Keys are collected in chunks of templates, between which time is checked.
+    """
+
+    n_candidates = count_skippy_templates(len(base_segs), n_for_ngram, max_gap_size, extended, inclusive)
+    action = budget.begin(n_candidates)
+    if action == "skip":
+        budget.end(0, 0)
+        return [ ]
+    if action is not None:
+        n_segs, max_gap_size = fit_skippy_budget(len(base_segs), n_for_ngram, max_gap_size, extended, inclusive, budget.max_candidates, action)
+        budget.hits[-1].update(n_segs = n_segs, max_gap_size = max_gap_size)
+        if action == "window" and n_segs < len(base_segs):
+            budget.record("candidates", "truncate", n_candidates = n_candidates, n_segs = n_segs, max_gap_size = max_gap_size)
+        base_segs = base_segs[:n_segs]
+        n_candidates = count_skippy_templates(n_segs, n_for_ngram, max_gap_size, extended, inclusive)
+        if check:
+            print(f"#{action}: n_segs = {n_segs}, max_gap_size = {max_gap_size}")
+        if n_segs < n_for_ngram:
+            budget.end(0, 0)
+            return [ ]
+
+    ## the passes of iter_skippy_ngrams(..), checking time per chunk of templates and output and time per n-gram
+    if vocab is not None:
+        base_segs = encode_segs(base_segs, vocab)
+        gap_mark = GAP_ID
+    import itertools
+    if as_ngram:
+        source = NgramSource(base_segs, gap_mark, sep)
+    xQ = set()
+    reason = None
+    chunk_size = 4096
+    n_keyed = 0
+    K = iter_skippy_keys(base_segs, n_for_ngram, max_gap_size, extended = extended, inclusive = inclusive, gap_mark = gap_mark, stats = stats)
+    while True:
+        chunk = list(itertools.islice(K, chunk_size))
+        xQ.update(chunk)
+        n_keyed += len(chunk)
+        if len(chunk) < chunk_size:
+            break
+        reason = budget.exceeded(0)
+        if reason is not None:
+            break
+    O = [ ]
+    T = list(itertools.islice(iter_skippy_templates(len(base_segs), n_for_ngram, max_gap_size, extended = extended, inclusive = inclusive), n_keyed)) if as_ngram else None
+    K = itertools.islice(iter_skippy_keys(base_segs, n_for_ngram, max_gap_size, extended = extended, inclusive = inclusive, gap_mark = gap_mark), n_keyed)
+    for x in select_skippy_ngrams(K, xQ, (gap_mark,), items = T, stats = stats, check = check):
+        ## once time is up in the first pass, the templates keyed so far are still emitted
+        r = budget.exceeded(len(O))
+        if r == "output" or (r is not None and reason is None):
+            reason = r
+            break
+        if as_ngram:
+            O.append(Ngram(source, x))
+        else:
+            O.append(x if vocab is not None else list(x))
+
     ##
-    if as_list:
-        return R
-    else:
-        return [ sep.join(r) for r in R ]
+    if reason is not None:
+        if budget.policy == "skip":
+            budget.record(reason, "skip", n_candidates = n_candidates)
+            O = [ ]
+        else:
+            budget.record(reason, "truncate", n_candidates = n_candidates)
+    budget.end(n_candidates, len(O))
+    return O
+
+##
+def is_char_level(segs: list, gap_mark: str = "…") -> bool:
+
+    """
+    tells if segments are single characters that can be rendered as a string with a single-character gap_mark without ambiguity
+    """
+
+    return len(gap_mark) == 1 and all( len(seg) == 1 for seg in segs ) and gap_mark not in segs
 
 ##
-def gen_skippy_ngrams(L: list, n_for_ngram: int, max_gap_size: int = None, extended: bool = True, inclusive: bool = True, recursively: bool = True, sep: str = " ", gap_mark: str = "…", as_list: bool = False, recursion_level: int = 0, verbose: bool = False, sort_elements: bool = False, check: bool = False):
+def compile_char_getters(k: int, n_for_ngram: int, extended: bool = True, inclusive: bool = True) -> tuple:
 
     """
-    general generator function that can be called
+    returns operator.itemgetter(..)s of the templates of compile_span_templates(..), cached in template_cache likewise,
+    which take the characters of a template out of a window of k characters with gap_mark appended in a single call
+    """
+
+    import operator
+    key = ("char", k, n_for_ngram, extended, inclusive)
+    R = template_cache.get(key)
+    if R is None:
+        S, C = compile_span_templates(k, n_for_ngram, extended = extended, inclusive = inclusive)
+        R = tuple( operator.itemgetter(*s) for s in S )
+        template_cache.put(key, R)
+    return R
+
+##
+def gen_char_skippy_ngrams(text: str, n_for_ngram: int, max_gap_size: int = None, extended: bool = True, inclusive: bool = True, recursively: bool = True, gap_mark: str = "…", check: bool = False) -> list:
+
+    """
+    character-level fast path of gen_skippy_ngrams(list(text), .., sep = ""), which returns the same list of strings.
+    N-grams are taken out of the string itself by cached itemgetters and joined once, and serve as their own keys,
+    with no lists of segments built. Inputs that are short or contain gap_mark go through gen_skippy_ngrams(..).
+    """
+
+    n_segs = len(text)
+    if n_segs < n_for_ngram or len(gap_mark) != 1 or gap_mark in text:
+        return gen_skippy_ngrams(list(text), n_for_ngram, max_gap_size = max_gap_size, extended = extended, inclusive = inclusive, recursively = recursively, sep = "", gap_mark = gap_mark, check = check)
+    join = "".join
+    K = [ ]
+    for k in range(1, get_max_span(n_segs, max_gap_size) + 1):
+        getters = compile_char_getters(k, n_for_ngram, extended = extended, inclusive = inclusive)
+        for i in range(n_segs - k + 1):
+            window = text[i : i + k] + gap_mark
+            K.extend( join(getter(window)) for getter in getters )
+    R = list(select_skippy_ngrams(K, set(K), gap_mark, check = check))
+    if check:
+        print(f"#R [size: {len(R)}]: {R}")
+    return R
+
+##
+def gen_skippy_ngrams(L: list, n_for_ngram: int, max_gap_size: int = None, extended: bool = True, inclusive: bool = True, recursively: bool = True, sep: str = " ", gap_mark: str = "…", as_list: bool = False, recursion_level: int = 0, verbose: bool = False, sort_elements: bool = False, vocab: dict = None, cache: NgramCache = None, stats: GenStats = None, budget: GenBudget = None, as_ngram: bool = False, check: bool = False):
+
+    """
+    general generator function that can be called.
+    With vocab given by make_vocab(..), n-grams are tuples of integer ids, where gaps have GAP_ID.
+    With cache given as an NgramCache, results for repeated inputs are reused (except with vocab, whose ids depend on its state).
+    With stats given as a GenStats, counters and timings of generation are collected in it.
+    With budget given as a GenBudget, generation is limited by it (and the cache is not used, since results may be cut).
+    With as_ngram = True, n-grams are Ngram objects, which are rendered to strings only on demand.
     """
 
     ##
@@ -284,130 +1148,595 @@ def gen_skippy_ngrams(L: list, n_for_ngram: int, max_gap_size: int = None, exten
 
     ## confirm assumption
     assert n_for_ngram > 0
+    assert not (as_ngram and vocab is not None), "as_ngram and vocab cannot be used together"
 
     ## filter out empty elements
     base_segs = [ seg for seg in L if len(seg) > 0 ]
 
+    ## look up the cache; values are kept as tuples so that callers cannot alter them
+    if cache is not None and vocab is None and budget is None:
+        key = (tuple(base_segs), n_for_ngram, max_gap_size, extended, inclusive, recursively, sep, gap_mark, as_list, as_ngram, recursion_level, sort_elements)
+        R = cache.get(key)
+        if stats is not None:
+            stats.count("cache_misses" if R is None else "cache_hits")
+        if R is None and recursively and len(base_segs) < n_for_ngram:
+            ## the recursion of short inputs consults the cache at every level
+            R = gen_skippy_ngrams_recursively(base_segs, n_for_ngram, recursion_level, max_gap_size = max_gap_size, extended = extended, inclusive = inclusive, sep = sep, gap_mark = gap_mark, as_list = as_list, verbose = verbose, as_ngram = as_ngram, cache = cache, check = check)
+            cache.put(key, tuple( tuple(r) if as_list else r for r in R ))
+            return R
+        if R is None:
+            R = gen_skippy_ngrams(base_segs, n_for_ngram, max_gap_size = max_gap_size, extended = extended, inclusive = inclusive, recursively = recursively, sep = sep, gap_mark = gap_mark, as_list = as_list, recursion_level = recursion_level, verbose = verbose, sort_elements = sort_elements, stats = stats, as_ngram = as_ngram, check = check)
+            cache.put(key, tuple( tuple(r) if as_list else r for r in R ))
+            return R
+        elif check:
+            print(f"#cache hit: {key}")
+        if as_list:
+            return [ list(r) for r in R ]
+        else:
+            return list(R)
+
     ##
     n_base_segs = len(base_segs)
+    if n_base_segs < n_for_ngram and vocab is not None:
+        G = gen_skippy_ngrams(base_segs, n_for_ngram, max_gap_size = max_gap_size, extended = extended, inclusive = inclusive, recursively = recursively, sep = sep, gap_mark = gap_mark, as_list = True, recursion_level = recursion_level, verbose = verbose, sort_elements = sort_elements, check = check)
+        return [ encode_segs(g, vocab) for g in G ]
     if n_base_segs < n_for_ngram:
         if recursively:
-            recursion_level += 1
-            G = gen_skippy_ngrams(base_segs, n_for_ngram - recursion_level, max_gap_size = max_gap_size, extended = extended, inclusive = inclusive, recursively = recursively, sep = sep, gap_mark = gap_mark, as_list = as_list, recursion_level = recursion_level, verbose = verbose, check = check)
-            G = make_unique(G)
-            if check:
-                print(f"#G in recursion level = {recursion_level}: {G}")
-            if as_list:
-                return G
-            else:
-                return [ sep.join(segs) for segs in G ]
+            return gen_skippy_ngrams_recursively(base_segs, n_for_ngram, recursion_level, max_gap_size = max_gap_size, extended = extended, inclusive = inclusive, sep = sep, gap_mark = gap_mark, as_list = as_list, verbose = verbose, as_ngram = as_ngram, cache = cache, check = check)
         else:
+            if as_ngram:
+                return [ Ngram(NgramSource(base_segs, gap_mark, sep), tuple(range(n_base_segs))) ]
             if as_list:
                 return [ base_segs ]
             else:
                 return [ sep.join(base_segs) ]
 
-    ## define divided or not
-    if max_gap_size is None or n_base_segs <= max_gap_size:
-        divided = False
+    ## enumerate valid segs directly, instead of filtering the product lattice of all substrings
+    if stats is not None:
+        import time
+        start = time.perf_counter()
+    char_level = sep == "" and not (as_list or as_ngram) and vocab is None and budget is None and stats is None and is_char_level(base_segs, gap_mark)
+    if char_level:
+        O = gen_char_skippy_ngrams("".join(base_segs), n_for_ngram, max_gap_size = max_gap_size, extended = extended, inclusive = inclusive, recursively = recursively, gap_mark = gap_mark, check = check)
+    elif budget is None:
+        O = list(iter_skippy_ngrams(base_segs, n_for_ngram, max_gap_size = max_gap_size, extended = extended, inclusive = inclusive, recursively = recursively, sep = sep, gap_mark = gap_mark, as_list = True, verbose = verbose, vocab = vocab, stats = stats, as_ngram = as_ngram, check = check))
     else:
-        divided = True
-    if check:
-        print(f"#search divided = {divided} [len(segs) = {n_base_segs}]")
+        O = gen_skippy_ngrams_in_budget(base_segs, n_for_ngram, budget, max_gap_size = max_gap_size, extended = extended, inclusive = inclusive, recursively = recursively, sep = sep, gap_mark = gap_mark, vocab = vocab, stats = stats, as_ngram = as_ngram, check = check)
+    if stats is not None:
+        stats.add_time("generation", time.perf_counter() - start)
+
+    ## sort elements by length
+    if sort_elements:
+        O = sorted(O, key = lambda x: len(x), reverse = True)
+    
     ##
-    subsegs_full = gen_ngrams(base_segs, n_base_segs, inclusive = True, sep = sep, as_list = True)
-    ## prevent irrelevant elements generated wrongly
-    subsegs_full = [ x for x in subsegs_full if type(x) is list or type(x) is tuple ]
     if check:
-        print(f"#subsegs_full (size: {len(subsegs_full)}): {subsegs_full}")
+        print(f"#O [size: {len(O)}]: {O}")
 
-    ## create subsegs_base with considration of max_gap_size
-    if divided:
-        subsegs_base = []
-        for G in gen_ngrams(subsegs_full, max_gap_size, inclusive = True, as_list = True, check = check):
-            for g in G:
-                if not g in subsegs_base:
-                    subsegs_base.append(g)
+    ## return
+    if as_list or vocab is not None or as_ngram or char_level:
+        return O
     else:
-        subsegs_base = subsegs_full
-    ##
-    base_size = len(subsegs_base)
-    if check:
-        print(f"#subsegs_base (size: {base_size}): {subsegs_base}")
+        return [ sep.join(x) for x in O ]
 
-    ## generate a lattice of segs, with or without subdivision
-    import itertools
-    ##P = itertools.product(gen_source(segs)) # not work!
-    #P = list(itertools.product(*gen_source(subsegs))) # list(..) is needed to retain result
-    P = filter_segs(subsegs_base, n_for_ngram, max_gap_size, extended = extended, inclusive = inclusive, gap_mark = gap_mark, verbose = verbose, check = check)
+##
+def gen_skippy_ngrams_recursively(base_segs: list, n_for_ngram: int, recursion_level: int, max_gap_size: int = None, extended: bool = True, inclusive: bool = True, sep: str = " ", gap_mark: str = "…", as_list: bool = False, verbose: bool = False, as_ngram: bool = False, cache: NgramCache = None, check: bool = False):
+
+    """
+    returns skippy n-grams of an input shorter than n_for_ngram by gen_skippy_ngrams(..) at the next recursion level,
+    passing cache on, so that every level is cached
+    """
+
+    recursion_level += 1
+    G = gen_skippy_ngrams(base_segs, n_for_ngram - recursion_level, max_gap_size = max_gap_size, extended = extended, inclusive = inclusive, recursively = True, sep = sep, gap_mark = gap_mark, as_list = as_list, recursion_level = recursion_level, verbose = verbose, cache = cache, as_ngram = as_ngram, check = check)
+    G = make_unique(G)
     if check:
-        print(f"#P0 [size: {len(P)}]: {P}")
+        print(f"#G in recursion level = {recursion_level}: {G}")
+    if as_list or as_ngram:
+        return G
+    else:
+        return [ sep.join(segs) for segs in G ]
 
-    ## regulate gaps
-    Q = [ ]
-    for i, p in enumerate(P):
-        if check and verbose:
-            print(f"#{i} p: {p}")
+##
+def iter_skippy_ngrams(L: list, n_for_ngram: int, max_gap_size: int = None, extended: bool = True, inclusive: bool = True, recursively: bool = True, sep: str = " ", gap_mark: str = "…", as_list: bool = False, verbose: bool = False, vocab: dict = None, stats: GenStats = None, as_ngram: bool = False, check: bool = False):
 
-        ## simplify a series of gaps
-        q = simplify_gaps(p, gap_mark = gap_mark, check = check)
-        if check and verbose:
-            print(f"#q1: {q}")
+    """
+    yields skippy n-grams one by one in the order gen_skippy_ngrams(..) returns them.
+    Only hashed keys are kept in memory: the first pass collects them and the second one yields
+    each gram at its first occurrence unless it is overgenerated.
+    """
+
+    ## confirm assumption
+    assert n_for_ngram > 0
+
+    ## filter out empty elements
+    base_segs = [ seg for seg in L if len(seg) > 0 ]
 
-        ## remove gaps at ends
-        if not extended:
-            q = drop_gap_at_end(q, gap_mark = gap_mark)
+    ## short inputs yield a few items only
+    n_base_segs = len(base_segs)
+    if n_base_segs < n_for_ngram:
+        if stats is not None:
+            stats.count("short_inputs")
+        yield from gen_skippy_ngrams(base_segs, n_for_ngram, max_gap_size = max_gap_size, extended = extended, inclusive = inclusive, recursively = recursively, sep = sep, gap_mark = gap_mark, as_list = as_list, verbose = verbose, vocab = vocab, as_ngram = as_ngram, check = check)
+        return
+
+    ## with a vocabulary, keys are made of ids, which are cheaper to hash than strings
+    if vocab is not None:
+        base_segs = encode_segs(base_segs, vocab)
+        gap_mark = GAP_ID
+
+    ## gaps in templates are already simplified and, unless extended, never placed at the ends
+    instrumented = stats is not None or check
+    if instrumented:
+        import time
+        start = time.perf_counter()
+    ## templates are not kept: both passes enumerate them
+    def gen_keys(stats: GenStats = None):
+        return iter_skippy_keys(base_segs, n_for_ngram, max_gap_size, extended = extended, inclusive = inclusive, gap_mark = gap_mark, stats = stats)
+
+    ## first pass: collect canonical keys
+    xQ = set(gen_keys(stats))
+    if instrumented:
+        if stats is not None:
+            stats.add_time("templates_and_keys", time.perf_counter() - start)
         if check:
-            print(f"#q2: {q}")
-        
-        ## prevent duplicates
-        if q not in Q:
-            Q.append(q)
-        else:
-            if check:
-                print(f"#ignored q: {q}")
-    ##
+            print(f"#xQ [size: {len(xQ)}]")
+
+    ## second pass: yield at the first occurrence, removing overgenerated segs
+    if as_ngram:
+        ## templates are shared by Ngram objects as their positions
+        source = NgramSource(base_segs, gap_mark, sep)
+        T = iter_skippy_templates(n_base_segs, n_for_ngram, max_gap_size, extended = extended, inclusive = inclusive)
+        for t in select_skippy_ngrams(gen_keys(), xQ, (gap_mark,), items = T, stats = stats, verbose = verbose, check = check):
+            yield Ngram(source, t)
+        return
+    if vocab is not None:
+        yield from select_skippy_ngrams(gen_keys(), xQ, (gap_mark,), stats = stats, verbose = verbose, check = check)
+    elif as_list:
+        yield from map(list, select_skippy_ngrams(gen_keys(), xQ, (gap_mark,), stats = stats, verbose = verbose, check = check))
+    else:
+        yield from map(sep.join, select_skippy_ngrams(gen_keys(), xQ, (gap_mark,), stats = stats, verbose = verbose, check = check))
+
+##
+def gen_skippy_ngrams_upto(L: list, max_n_for_ngram: int, max_gap_size: int = None, extended: bool = True, inclusive: bool = True, recursively: bool = True, sep: str = " ", gap_mark: str = "…", as_list: bool = False, verbose: bool = False, sort_elements: bool = False, check: bool = False):
+
+    """
+    returns a dict that maps n to gen_skippy_ngrams(L, n, ..) for n = 1, ..., max_n_for_ngram.
+    All orders are read off a single enumeration for the largest n: a gram with n elements belongs
+    to order n (and to higher orders if inclusive), and its overgeneration check does not depend on n,
+    since adding a gap does not change the number of elements.
+    """
+
+    ## confirm assumption
+    assert max_n_for_ngram > 0
+
+    ## filter out empty elements
+    base_segs = [ seg for seg in L if len(seg) > 0 ]
+    n_base_segs = len(base_segs)
+
+    ## orders higher than the input length fall back to the (cheap) short-input path
+    R = { }
+    n_top = min(max_n_for_ngram, n_base_segs)
+    for n in range(n_top + 1, max_n_for_ngram + 1):
+        R[n] = gen_skippy_ngrams(base_segs, n, max_gap_size = max_gap_size, extended = extended, inclusive = inclusive, recursively = recursively, sep = sep, gap_mark = gap_mark, as_list = as_list, verbose = verbose, sort_elements = sort_elements, check = check)
+
+    ## collect canonical keys with their numbers of elements in the order of first occurrence
+    K = { }
+    gather = (base_segs + [ gap_mark ]).__getitem__
+    for t in iter_skippy_templates(n_base_segs, n_top, max_gap_size, extended = extended, inclusive = True):
+        key = tuple(map(gather, t))
+        if key not in K:
+            K[key] = len(t) - t.count(-1)
     if check:
-        print(f"#Q [size: {len(Q)}]: {Q}")
+        print(f"#K [size: {len(K)}]")
 
-    ## remove overgenerated segs
-    O = []
-    for q in Q:
-        #c= q.copy() # ineffective
-        c1 = q.copy()
-        c2 = q.copy()
-        c1.append(gap_mark) # not c1 = c.append(gap_mark)
-        c2.insert(0, gap_mark) # not c2 = c.insert(0, gap_mark)
-        if check and verbose:
-            print(f"#c1: {c1}")
-            print(f"#c2: {c2}")
-        if c1 in Q:
+    ## distribute grams over orders, removing overgenerated segs
+    O = { n: [ ] for n in range(1, n_top + 1) }
+    for key, n_elements in K.items():
+        if is_overgenerated(key, K, (gap_mark,)):
             if check:
-                print(f"#removed {q}")
-        elif c2 in Q:
-            if check:
-                print(f"#removed {q}")
+                print(f"#removed {key}")
+            continue
+        if inclusive:
+            orders = range(n_elements, n_top + 1)
         else:
-            O.append(q)
-            if check:
-                print(f"#kept: {q}")
-    
-    ## sort elements by length
-    if sort_elements:
-        O = sorted(O, key = lambda x: len(x), reverse = True)
-    
+            orders = [ n_elements ]
+        for n in orders:
+            O[n].append(list(key))
+
     ##
+    for n, G in O.items():
+        if sort_elements:
+            G = sorted(G, key = lambda x: len(x), reverse = True)
+        if as_list:
+            R[n] = G
+        else:
+            R[n] = [ sep.join(x) for x in G ]
+    return { n: R[n] for n in sorted(R) }
+
+## aliases
+gen_sk_ngrams = gen_skippy_ngrams
+iter_sk_ngrams = iter_skippy_ngrams
+
+## parameters shared by the documents a worker process handles; set once per worker by init_corpus_worker(..)
+corpus_params = None
+
+##
+def init_corpus_worker(params: dict):
+
+    """
+    initializes a worker process of the corpus API with the parameters of generation
+    """
+
+    global corpus_params
+    corpus_params = params
+
+##
+def run_corpus_worker(item: tuple, params: dict = None):
+
+    """
+    segments a document if needed and generates skippy n-grams out of it, returning (index, grams, usage),
+    where usage is None or, with a budget, (hits, totals) of this document to be merged in the parent process.
+    params defaults to corpus_params of a worker process.
+    """
+
+    i, doc = item
+    params = dict(corpus_params if params is None else params)
+    pattern = params.pop("pattern")
+    if type(doc) is str:
+        doc = segment(doc, pattern)
+    else:
+        doc = [ seg for seg in doc if len(seg) > 0 ]
+    ## blank documents have no grams, and short ones are handled at their own length, as run_cli_worker(..) does
+    if len(doc) == 0:
+        return i, [ ], None
+    if params["recursively"]:
+        params["n_for_ngram"] = min(params["n_for_ngram"], len(doc))
+    budget = params["budget"]
+    if budget is None:
+        return i, gen_skippy_ngrams(doc, **params), None
+    budget.doc = i
+    n_hits = len(budget.hits)
+    totals = dict(budget.totals)
+    G = gen_skippy_ngrams(doc, **params)
+    return i, G, (budget.hits[n_hits:], { name: budget.totals[name] - totals[name] for name in totals })
+
+##
+def iter_skippy_ngrams_corpus(docs, n_for_ngram: int, max_gap_size: int = None, extended: bool = True, inclusive: bool = True, recursively: bool = True, sep: str = " ", gap_mark: str = "…", as_list: bool = False, sort_elements: bool = False, pattern: str = r"", n_jobs: int = None, chunksize: int = None, ordered: bool = True, cache: NgramCache = None, budget: GenBudget = None, check: bool = False):
+
+    """
+    takes an iterable of documents, either strings to segment with pattern (a regex or a Segmenter) or lists of segments,
+    and yields (index, grams) pairs of gen_skippy_ngrams(..) computed in a process pool of n_jobs workers.
+    Documents are sent to workers in chunks of chunksize. With ordered = False, pairs come in completion order.
+    n_jobs = None uses all CPUs, and n_jobs = 1 runs in the current process.
+    A cache is used as it is in the current process, while each worker of a pool gets a copy of its own.
+    A budget is used as it is in the current process, while workers of a pool get its per-call limits only;
+    their hits and totals are merged into it, and its per-corpus limits are enforced here: documents are then sent
+    in batches of two chunks per worker, and once the limits are reached, the grams of the batch in flight are dropped
+    and no more documents are sent.
+    """
+
+    import os
+    params = dict(n_for_ngram = n_for_ngram, max_gap_size = max_gap_size, extended = extended, inclusive = inclusive, recursively = recursively, sep = sep, gap_mark = gap_mark, as_list = as_list, sort_elements = sort_elements, pattern = pattern, cache = cache, budget = budget)
+    if n_jobs is None:
+        n_jobs = os.cpu_count() or 1
     if check:
-        print(f"#O [size: {len(O)}]: {O}")
+        print(f"#n_jobs: {n_jobs}")
+
+    ## run serially
+    if n_jobs == 1:
+        for item in enumerate(docs):
+            i, G, usage = run_corpus_worker(item, params)
+            yield i, G
+        if budget is not None:
+            budget.doc = None
+        return
+
+    ## a few chunks per worker balance the load without too much IPC;
+    ## with per-corpus limits, chunks are kept small, as the limits are checked between batches of them
+    limited = budget is not None and budget.has_corpus_limits()
+    if chunksize is None:
+        try:
+            chunksize = max(1, len(docs) // (n_jobs * 4))
+        except TypeError:
+            chunksize = 64
+        if limited:
+            chunksize = min(chunksize, 8)
+    if check:
+        print(f"#chunksize: {chunksize}")
+
+    ## Pool.imap(..) drains its input at once, so documents are sent batch by batch when limits must stop them
+    import itertools, multiprocessing
+    if budget is not None:
+        params["budget"] = budget.for_worker()
+    items = enumerate(docs)
+    with multiprocessing.Pool(n_jobs, initializer = init_corpus_worker, initargs = (params,)) as pool:
+        imap = pool.imap if ordered else pool.imap_unordered
+        while True:
+            if limited:
+                if budget.corpus_exceeded() is not None:
+                    break
+                batch = list(itertools.islice(items, n_jobs * chunksize * 2))
+                if len(batch) == 0:
+                    break
+            else:
+                batch = items
+            for i, G, usage in imap(run_corpus_worker, batch, chunksize):
+                if budget is not None:
+                    name = budget.corpus_exceeded()
+                    if name is not None:
+                        budget.record(f"corpus_{name}", "skip", doc = i)
+                        G = [ ]
+                    elif usage is not None:
+                        hits, totals = usage
+                        budget.hits.extend(hits)
+                        for name, x in totals.items():
+                            budget.totals[name] += x
+                yield i, G
+            if not limited:
+                break
+
+    ## documents left over the per-corpus limits are skipped without being sent
+    if limited:
+        name = budget.corpus_exceeded()
+        for i, doc in items:
+            budget.record(f"corpus_{name}", "skip", doc = i)
+            yield i, [ ]
 
-    ## return
+##
+def gen_skippy_ngrams_corpus(docs, n_for_ngram: int, max_gap_size: int = None, extended: bool = True, inclusive: bool = True, recursively: bool = True, sep: str = " ", gap_mark: str = "…", as_list: bool = False, sort_elements: bool = False, pattern: str = r"", n_jobs: int = None, chunksize: int = None, ordered: bool = True, cache: NgramCache = None, budget: GenBudget = None, check: bool = False):
+
+    """
+    takes a list of documents and returns a list of their skippy n-grams computed in a process pool.
+    With ordered = True, the i-th item holds the grams of the i-th document;
+    otherwise, items are (index, grams) pairs in completion order.
+    """
+
+    R = iter_skippy_ngrams_corpus(docs, n_for_ngram, max_gap_size = max_gap_size, extended = extended, inclusive = inclusive, recursively = recursively, sep = sep, gap_mark = gap_mark, as_list = as_list, sort_elements = sort_elements, pattern = pattern, n_jobs = n_jobs, chunksize = chunksize, ordered = ordered, cache = cache, budget = budget, check = check)
+    if ordered:
+        return [ grams for i, grams in R ]
+    else:
+        return list(R)
+
+##
+def count_skippy_ngrams(L: list, n_for_ngram: int, max_gap_size: int = None, extended: bool = True, inclusive: bool = True, recursively: bool = True, sep: str = " ", gap_mark: str = "…", vocab: dict = None, check: bool = False) -> dict:
+
+    """
+    returns a dict from the skippy n-grams of gen_skippy_ngrams(..) to the numbers of their occurrences,
+    i.e., of the position templates that realize them, in a list of segments.
+    With vocab given by make_vocab(..), the keys are tuples of ids.
+    Lists shorter than n_for_ngram are counted at their own length if recursively, and empty ones have no n-grams.
+    """
+
+    ## filter out empty elements
+    base_segs = [ seg for seg in L if len(seg) > 0 ]
+    n_base_segs = len(base_segs)
+
+    ## empty inputs have no n-grams; short ones are counted at their own length, as in ngram_features.count_doc_features(..),
+    ## or as a single occurrence of the whole input without recursion
+    if n_base_segs == 0:
+        return { }
+    if n_base_segs < n_for_ngram:
+        if not recursively:
+            g = encode_segs(base_segs, vocab) if vocab is not None else sep.join(base_segs)
+            return { g: 1 }
+        n_for_ngram = n_base_segs
+
+    ##
+    if vocab is not None:
+        base_segs = list(encode_segs(base_segs, vocab))
+        gap_mark = GAP_ID
+    C = { }
+    for key in iter_skippy_keys(base_segs, n_for_ngram, max_gap_size, extended = extended, inclusive = inclusive, gap_mark = gap_mark):
+        C[key] = C.get(key, 0) + 1
+
+    ## remove overgenerated segs
+    R = { }
+    for key, c in C.items():
+        if is_overgenerated(key, C, (gap_mark,)):
+            continue
+        ## different keys may be joined into the same string
+        if vocab is None:
+            key = sep.join(key)
+        R[key] = R.get(key, 0) + c
+    if check:
+        print(f"#R [size: {len(R)}]: {R}")
+    return R
+
+##
+def iter_skippy_ngram_occurrences(L: list, n_for_ngram: int, max_gap_size: int = None, extended: bool = True, inclusive: bool = True, gap_mark: str = "…", vocab: dict = None):
+
+    """
+    yields (key, positions) for every occurrence of the skippy n-grams of gen_skippy_ngrams(..) in a list of
+    at least n_for_ngram segments, where key is a tuple of segments (or of ids with vocab) and positions
+    is the tuple of positions of its segments, gaps excluded
+    """
+
+    base_segs = [ seg for seg in L if len(seg) > 0 ]
+    assert len(base_segs) >= n_for_ngram
+    if vocab is not None:
+        base_segs = list(encode_segs(base_segs, vocab))
+        gap_mark = GAP_ID
+    Q = set(iter_skippy_keys(base_segs, n_for_ngram, max_gap_size, extended = extended, inclusive = inclusive, gap_mark = gap_mark))
+    gather = (base_segs + [ gap_mark ]).__getitem__
+    for t in iter_skippy_templates(len(base_segs), n_for_ngram, max_gap_size, extended = extended, inclusive = inclusive):
+        key = tuple(map(gather, t))
+        if is_overgenerated(key, Q, (gap_mark,)):
+            continue
+        yield key, tuple( j for j in t if j >= 0 )
+
+##
+def compile_window_patterns(n_for_ngram: int, max_gap_size: int, extended: bool = True, inclusive: bool = True) -> tuple:
+
+    """
+    returns (span, template) pairs of the templates of compile_span_templates(..) for spans up to max_gap_size + 2,
+    i.e., the templates of every start position, whose positions are offsets from the start and -1 is a gap
+    """
+
+    return tuple( (k, s) for k in range(1, max_gap_size + 3) for s in compile_span_templates(k, n_for_ngram, extended = extended, inclusive = inclusive)[0] )
+
+##
+def iter_skippy_ngrams_windowed(L, n_for_ngram: int, max_gap_size: int, extended: bool = True, inclusive: bool = True, sep: str = " ", gap_mark: str = "…", as_list: bool = False, with_positions: bool = False):
+
+    """
+    yields every occurrence of skippy n-grams in a long sequence of segments exactly once, sliding a window
+    of max_gap_size + 2 segments over it, so that memory stays constant regardless of its length; L can be any iterable.
+    Occurrences are those of the templates of gen_skippy_ngrams(..), in the order of their start positions,
+    and with_positions = True gives (n-gram, positions) pairs, where positions exclude gaps.
+    Unlike gen_skippy_ngrams(..), occurrences are not deduplicated and overgenerated n-grams are not removed,
+    which needs the whole sequence; count_skippy_ngrams_windowed(..) does both for counts.
+    Sequences shorter than n_for_ngram give the n-grams that fit in them only.
+    """
+
+    import collections
+    assert n_for_ngram > 0
+    assert max_gap_size is not None and max_gap_size >= 0, "windowed generation needs max_gap_size"
+    patterns = compile_window_patterns(n_for_ngram, max_gap_size, extended = extended, inclusive = inclusive)
+    window = collections.deque(maxlen = max_gap_size + 2)
     if as_list:
-        return O
+        render = list
     else:
-        return [ sep.join(x) for x in O ]
+        render = sep.join
 
-## aliases
-gen_sk_ngrams = gen_skippy_ngrams
+    ## occurrences that start at the head of the window, with n_ahead segments in it
+    def gen_at(start: int, n_ahead: int):
+        gather = (list(window) + [ gap_mark ]).__getitem__
+        for span, t in patterns:
+            if span > n_ahead:
+                continue
+            g = render(map(gather, t))
+            if with_positions:
+                yield g, tuple( start + j for j in t if j >= 0 )
+            else:
+                yield g
+
+    ##
+    i = 0
+    for seg in L:
+        if len(seg) == 0:
+            continue
+        window.append(seg)
+        i += 1
+        if len(window) == window.maxlen:
+            yield from gen_at(i - len(window), len(window))
+    ## the rest of the sequence, whose segments are all in the window
+    start = i - len(window) + (1 if len(window) == window.maxlen else 0)
+    if len(window) == window.maxlen:
+        window.popleft()
+    while len(window) > 0:
+        yield from gen_at(start, len(window))
+        window.popleft()
+        start += 1
+
+##
+def count_skippy_ngrams_windowed(L, n_for_ngram: int, max_gap_size: int, extended: bool = True, inclusive: bool = True, sep: str = " ", gap_mark: str = "…") -> dict:
+
+    """
+    returns the counts of count_skippy_ngrams(..) for a long sequence of at least n_for_ngram segments,
+    from occurrences of iter_skippy_ngrams_windowed(..), so that memory grows with the number of distinct n-grams only
+    """
+
+    C = { }
+    for key in iter_skippy_ngrams_windowed(L, n_for_ngram, max_gap_size, extended = extended, inclusive = inclusive, gap_mark = gap_mark, as_list = True):
+        key = tuple(key)
+        C[key] = C.get(key, 0) + 1
+    R = { }
+    for key, c in C.items():
+        if is_overgenerated(key, C, (gap_mark,)):
+            continue
+        ## different keys may be joined into the same string
+        key = sep.join(key)
+        R[key] = R.get(key, 0) + c
+    return R
+
+##
+def write_count_run(C: dict, tmp_dir: str = None) -> str:
+
+    """
+    writes partial counts {gram: [tf, df]} sorted by gram into a temporary file, one JSON record per line, and returns its path
+    """
+
+    import json, os, tempfile
+    fd, path = tempfile.mkstemp(prefix = "skippy-counts-", suffix = ".jsonl", dir = tmp_dir)
+    with os.fdopen(fd, "w", encoding = "utf-8") as f:
+        for gram in sorted(C):
+            tf, df = C[gram]
+            f.write(json.dumps([gram, tf, df], ensure_ascii = False) + "\n")
+    return path
+
+##
+def read_count_run(path: str):
+
+    """
+    yields (gram, tf, df) records of a file written by write_count_run(..)
+    """
+
+    import json
+    with open(path, encoding = "utf-8") as f:
+        for line in f:
+            gram, tf, df = json.loads(line)
+            yield gram, tf, df
+
+##
+def iter_skippy_ngram_counts(docs, n_for_ngram: int, max_gap_size: int = None, extended: bool = True, inclusive: bool = True, recursively: bool = True, sep: str = " ", gap_mark: str = "…", pattern: str = r"", max_items: int = 1000000, tmp_dir: str = None, check: bool = False):
+
+    """
+    counts skippy n-grams over documents, either strings to segment with pattern (a regex or a Segmenter) or lists of segments,
+    and yields (gram, tf, df) sorted by gram, where tf is the number of occurrences and df that of documents.
+    Once more than max_items grams are held in memory, partial counts are spilled to a sorted run in tmp_dir,
+    and the runs are merged at the end, so corpora larger than memory can be counted.
+    """
+
+    import heapq, os
+    C = { }
+    paths = [ ]
+    try:
+        for i, doc in enumerate(docs):
+            if type(doc) is str:
+                doc = segment(doc, pattern)
+            for gram, c in count_skippy_ngrams(doc, n_for_ngram, max_gap_size = max_gap_size, extended = extended, inclusive = inclusive, recursively = recursively, sep = sep, gap_mark = gap_mark).items():
+                try:
+                    r = C[gram]
+                    r[0] += c
+                    r[1] += 1
+                except KeyError:
+                    C[gram] = [c, 1]
+            ## spill
+            if len(C) > max_items:
+                paths.append(write_count_run(C, tmp_dir = tmp_dir))
+                if check:
+                    print(f"#spilled {len(C)} grams at doc {i} into {paths[-1]}")
+                C = { }
+
+        ## merge the runs with the counts left in memory
+        runs = [ read_count_run(path) for path in paths ]
+        runs.append( (gram, C[gram][0], C[gram][1]) for gram in sorted(C) )
+        last, tf_sum, df_sum = None, 0, 0
+        for gram, tf, df in heapq.merge(*runs, key = lambda r: r[0]):
+            if gram != last:
+                if last is not None:
+                    yield last, tf_sum, df_sum
+                last, tf_sum, df_sum = gram, 0, 0
+            tf_sum += tf
+            df_sum += df
+        if last is not None:
+            yield last, tf_sum, df_sum
+    finally:
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+##
+def count_skippy_ngrams_corpus(docs, n_for_ngram: int, max_gap_size: int = None, extended: bool = True, inclusive: bool = True, recursively: bool = True, sep: str = " ", gap_mark: str = "…", pattern: str = r"", max_items: int = 1000000, tmp_dir: str = None, check: bool = False) -> dict:
+
+    """
+    returns a dict {gram: (tf, df)} built by iter_skippy_ngram_counts(..)
+    """
+
+    R = iter_skippy_ngram_counts(docs, n_for_ngram, max_gap_size = max_gap_size, extended = extended, inclusive = inclusive, recursively = recursively, sep = sep, gap_mark = gap_mark, pattern = pattern, max_items = max_items, tmp_dir = tmp_dir, check = check)
+    return { gram: (tf, df) for gram, tf, df in R }
 
 ##
 def test_gen_ngrams(docs, max_n_for_ngram: int, inclusive: bool = True, as_list: bool = False, verbose: bool = False, reordered: bool = True, check: bool = False):
@@ -485,8 +1814,128 @@ def main():
     ## test gen_ngrams
     test_gen_skippy_ngrams(docs, max_n_for_ngram = max_n_for_ngram, max_gap_size = max_gap_size, extended = extended, inclusive = inclusive, as_list = as_list, verbose = verbose, check = check)
 
+##
+def run_cli_worker(item: tuple, params: dict = None):
+
+    """
+    segments a line and generates its n-grams with params, or corpus_params set by init_corpus_worker(..), returning (index, line, grams)
+    """
+
+    i, line = item
+    p = corpus_params if params is None else params
+    segs = segment(line, p["pattern"])
+    if len(segs) == 0:
+        return i, line, [ ]
+    ## lines shorter than n are handled at their own length, which is what recursion aims at
+    n_for_ngram = p["n_for_ngram"]
+    if p["recursively"]:
+        n_for_ngram = min(n_for_ngram, len(segs))
+    if p["mode"] == "normal":
+        G = gen_ngrams(segs, n_for_ngram, inclusive = p["inclusive"], recursively = p["recursively"], sep = p["sep"])
+    else:
+        G = gen_skippy_ngrams(segs, n_for_ngram, max_gap_size = p["max_gap_size"], extended = p["mode"] == "extended", inclusive = p["inclusive"], recursively = p["recursively"], sep = p["sep"], gap_mark = p["gap_mark"], sort_elements = p["sort_elements"])
+    return i, line, G
+
+##
+def iter_lines(paths: list):
+
+    """
+    yields lines of files without newlines one by one, where "-" stands for stdin
+    """
+
+    import sys
+    for path in paths:
+        if path == "-":
+            f = sys.stdin
+        else:
+            f = open(path, encoding = "utf-8")
+        try:
+            for line in f:
+                yield line.rstrip("\r\n")
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+##
+def cli(argv: list = None):
+
+    """
+    command-line entry point that streams lines from files or stdin and writes their n-grams as TSV or JSONL.
+    At most buffer_size lines are in flight at a time, so memory is bounded regardless of the input size.
+    """
+
+    import argparse, itertools, json, sys
+    parser = argparse.ArgumentParser(description = "generates normal, skippy or extended skippy n-grams from lines of text")
+    parser.add_argument("files", nargs = "*", default = [ "-" ], help = "input files; '-' for stdin, which is also read if only options are given")
+    parser.add_argument("-n", "--n_for_ngram", type = int, default = 3)
+    parser.add_argument("-m", "--mode", choices = [ "normal", "skippy", "extended" ], default = "extended")
+    parser.add_argument("-g", "--max_gap_size", type = int, default = None)
+    parser.add_argument("-p", "--pattern", default = r"", help = "regex to segment a line; the default splits it into characters")
+    parser.add_argument("--normalization", default = None, choices = [ "NFC", "NFD", "NFKC", "NFKD" ], help = "Unicode normalization of lines before segmentation")
+    parser.add_argument("--casefold", action = "store_true", help = "casefold lines before segmentation")
+    parser.add_argument("--exclusive", action = "store_true", help = "generate n-grams of size n only")
+    parser.add_argument("--no_recursion", action = "store_true", help = "do not generate shorter n-grams from short inputs")
+    parser.add_argument("--sep", default = " ")
+    parser.add_argument("--gap_mark", default = "…")
+    parser.add_argument("--sort_elements", action = "store_true")
+    parser.add_argument("-f", "--format", choices = [ "tsv", "jsonl" ], default = "tsv", help = "tsv gives a line index and a gram per row; jsonl gives a record per line")
+    parser.add_argument("-o", "--output", default = "-")
+    parser.add_argument("-j", "--n_jobs", type = int, default = 1)
+    parser.add_argument("-b", "--buffer_size", type = int, default = 10000, help = "max number of lines in flight")
+    args = parser.parse_args(argv)
+
+    ##
+    params = dict(mode = args.mode, n_for_ngram = args.n_for_ngram, max_gap_size = args.max_gap_size, pattern = Segmenter(args.pattern, normalization = args.normalization, casefold = args.casefold), inclusive = not args.exclusive, recursively = not args.no_recursion, sep = args.sep, gap_mark = args.gap_mark, sort_elements = args.sort_elements)
+    if args.output == "-":
+        out = sys.stdout
+    else:
+        out = open(args.output, "w", encoding = "utf-8")
+
+    ##
+    def write(result: tuple):
+        i, line, G = result
+        if args.format == "jsonl":
+            out.write(json.dumps({ "id": i, "text": line, "ngrams": G }, ensure_ascii = False) + "\n")
+        else:
+            for g in G:
+                out.write(f"{i}\t{g}\n")
+
+    ## process lines in batches of buffer_size
+    lines = enumerate(iter_lines(args.files))
+    pool = None
+    try:
+        if args.n_jobs != 1:
+            import multiprocessing, os
+            n_jobs = args.n_jobs or os.cpu_count() or 1
+            pool = multiprocessing.Pool(n_jobs, initializer = init_corpus_worker, initargs = (params,))
+        while True:
+            batch = list(itertools.islice(lines, args.buffer_size))
+            if len(batch) == 0:
+                break
+            if pool is None:
+                R = ( run_cli_worker(item, params) for item in batch )
+            else:
+                R = pool.imap(run_cli_worker, batch, max(1, len(batch) // (n_jobs * 4)))
+            for r in R:
+                write(r)
+    except BrokenPipeError:
+        ## the reader has gone, e.g., head
+        return 1
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
 ##
 if __name__ == "__main__":
-    main()
+    import sys
+    ## with no arguments, run the test code as before, whatever stdin is; stdin is read with "-" or options only
+    if len(sys.argv) > 1:
+        sys.exit(cli())
+    else:
+        main()
 
 ### end of file
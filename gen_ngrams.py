@@ -11,6 +11,12 @@ Modified:
 2024/11/24 fixed a serious bug that mishandles short input
 2025/01/03 added skppy_ngram_size, gen_extended_skippy_ngrams
 2025/08/20 re-designed gen_extended_skippy_ngrams function with a better and simpler algorith
+2026/10/17 added lazy iter_ngrams and iter_skippy_ngrams, on which gen_ngrams and gen_skippy_ngrams are built
+2026/10/17 implemented max_distance by iter_skippy_indices, which yields each position tuple once; added gen_skippy_index_matrix for NumPy
+2026/10/17 added budget option to gen_skippy_ngrams, taking a gen2_ngrams.GenBudget, and count_skippy_indices
+2026/10/17 repaired make_substrings and gen_skippy_ngrams_from_str, which take slices of the string for characters
+2026/10/17 added budget option to gen_extended_skippy_ngrams, built on lazy iter_extended_skippy_ngrams; "truncate" cuts the input as in gen2_ngrams
+2026/10/17 fixed iter_skippy_ngrams, which carried the last position over from the previous tuple and gave as_list results a spurious leading gap
 """
 
 ## imports
@@ -33,94 +39,38 @@ def segment (text: str, sep: str, check: bool):
     return L
 
 ##
-def make_substrings (P, missing_mark: str = "_", as_list: bool = False, check: bool = False):
-    ## generate substrings
+def make_substrings (S, P, sep: str = " ", missing_mark: str = "…", as_list: bool = False, check: bool = False):
+    """
+    takes segments S, a list or a string of characters, and position tuples P, and returns their skippy n-grams,
+    with missing_mark between positions that are not adjacent. Runs of adjacent positions are taken as slices of S,
+    so that a string S with sep = "" gives n-grams made of slices of the string itself.
+    """
     Q = [ ]
     for p in P:
-        ##
         if check:
             print(f"#p: {p}")
+        ## runs of adjacent positions
+        runs = [ ]
+        start = last = p[0]
+        for i in p[1:]:
+            if i != last + 1:
+                runs.append(S[start : last + 1])
+                start = i
+            last = i
+        runs.append(S[start : last + 1])
         ##
-        q = [ ]
-        
-        ## irrelevant cases
-        if len(p) < 1:
-            pass
-        
-        ## cases where len(p) > 1
-        elif len(p) >= 2:
-            for i in range(len(p)):
-                try:
-                    sec = p[i:i+2]
-                    if check:
-                        print(f"#sec: {sec}")
-                    pos, next_pos = sec[0], sec[1]
-                except IndexError:
-                    pos, next_pos = p[i], p[i]
-                gap = (next_pos - pos)
-                if check:
-                    print(f"#pos: {pos}; next_pos: {next_pos}")
-                    print(f"#gap: {gap}")
-                seg = S[pos]
-                if gap > 1:
-                    if pos == 0:
-                        q.append (seg)
-                        q.append (missing_mark)
-                    elif pos == next_pos:
-                        q.append (seg)
-                    else:
-                        q.append (missing_mark)
-                        q.append (seg)
-                        q.append (missing_mark)
-                elif gap == 1:
-                    if pos == 0:
-                        q.append (seg)
-                    elif pos == next_pos:
-                        q.append (seg)
-                    else:
-                        q.append (missing_mark)
-                        q.append (seg)
-                else:
-                    if pos == 0:
-                        q.append (seg)
-                    elif pos == next_pos:
-                        q.append (seg)
-                    else:
-                        q.append (seg)
-                        q.append (missing_mark)
-        
-        ## cases where len(p) ==  1
+        if as_list:
+            q = list(runs[0])
+            for run in runs[1:]:
+                q.append(missing_mark)
+                q.extend(run)
+            Q.append(q)
+        elif type(S) is str and sep == "":
+            Q.append(missing_mark.join(runs))
         else:
-            for pos in p:
-                if check:
-                    print(f"#pos: {pos}")
-                seg = S[pos]
-                if   ( pos == 0 ):
-                    q.append(seg)
-                    q.append(missing_mark)
-                elif ( pos == (S_len - 1)):
-                    q.append(missing_mark)
-                    q.append(seg)
-                else:
-                    q.append(missing_mark)
-                    q.append(seg)
-                    q.append(missing_mark)
-        ## singlify repeated missing_marks
-        q2 = []
-        last = ""
-        for x in q:
-            if x != last:
-                q2.append(x)
-            last = x
-        q = q2
-        ## update
-        Q.append(q)
-    
-    ## return result
-    if as_list: ## result is a list of unstrung lists
-        return Q
-    else: ## result is a list of strings
-        return [ sep.join(q) for q in Q ]
+            Q.append(f"{sep}{missing_mark}{sep}".join( sep.join(run) for run in runs ))
+    ##
+    return Q
 
 ##
 def gen_ngrams (S: list, n: int, sep: str = " ", as_list: bool = False, check: bool = False):
@@ -140,19 +90,33 @@ def gen_ngrams (S: list, n: int, sep: str = " ", as_list: bool = False, check: b
         else:
             return [ sep.join(S) ]
     #
-    R = [ ]
-    for i, x in enumerate(S):
-        try:
-            y = S[ i : i + n] # get an n-gram
-            if len(y) == n: # check its length
-                R.append(y)
-        except IndexError:
-            pass
+    return list(iter_ngrams (S, n, sep = sep, as_list = as_list))
+
+##
+def iter_ngrams (S: list, n: int, sep: str = " ", as_list: bool = False, check: bool = False):
+    """
+    takes a list S of segments and yields n-grams out of them one by one.
+    """
+    assert n > 0
     ##
-    if as_list:
-        return R
-    else:
-        return [ sep.join(r) for r in R ]
+    if check:
+        print(f"#S: {S}")
+    ##
+    S = [ seg for seg in S if len(seg) > 0 ]
+    ##
+    if len(S) <= n:
+        if as_list:
+            yield S
+        else:
+            yield sep.join(S)
+        return
+    #
+    for i in range(len(S) - n + 1):
+        y = S[ i : i + n] # get an n-gram
+        if as_list:
+            yield y
+        else:
+            yield sep.join(y)
 
 ##
 def gen_ngrams_from_str (text: str, n: int, sep = " ", as_list = False, check = False):
@@ -185,9 +149,112 @@ def gen_ngrams_from_str (text: str, n: int, sep = " ", as_list = False, check =
         return [ sep.join(r) for r in R ]
 
 ##
-def gen_skippy_ngrams (S: list, n: int, max_distance = None, sep: str = " ", missing_mark: str = "…", as_list: bool = False, check: bool = False):
+def iter_skippy_indices (S_len: int, n: int, max_distance = None):
     """
-    takes a list of segments and returns a list of skippy n-grams out of them
+    yields the position tuples of skippy n-grams over S_len segments in lexicographic order.
+    Each tuple is anchored on its first position, so it comes exactly once even with max_distance,
+    which bounds the distance between the first and the last positions.
+    """
+    assert n > 0
+    if max_distance is None:
+        max_distance = S_len - 1
+    for i in range(S_len):
+        for rest in itertools.combinations(range(i + 1, min(S_len, i + max_distance + 1)), n - 1):
+            yield (i,) + rest
+
+##
+def gen_skippy_index_matrix (S_len: int, n: int, max_distance = None):
+    """
+    returns the position tuples of iter_skippy_indices as rows of a NumPy array of shape (m, n), in the same order.
+    The offsets of a window are enumerated once and broadcast over all start positions.
+    """
+    import numpy as np
+    assert n > 0
+    if max_distance is None or max_distance >= S_len:
+        max_distance = S_len - 1
+    ## offsets relative to the first position
+    offsets = np.array([ (0,) + c for c in itertools.combinations(range(1, max_distance + 1), n - 1) ], dtype = np.intp).reshape(-1, n)
+    ## positions of all windows, of shape (S_len, len(offsets), n)
+    M = np.arange(S_len, dtype = np.intp)[:, None, None] + offsets[None, :, :]
+    ## keep the tuples that end within the sequence
+    return M[M[:, :, -1] < S_len]
+
+##
+def count_skippy_indices (S_len: int, n: int, max_distance = None) -> int:
+    """
+    returns the number of position tuples of iter_skippy_indices without enumerating them
+    """
+    import math
+    assert n > 0
+    if max_distance is None:
+        max_distance = S_len - 1
+    return sum( math.comb(min(S_len - 1 - i, max_distance), n - 1) for i in range(S_len) )
+
+##
+def fit_skippy_budget (S_len: int, n: int, max_distance, max_candidates: int, policy: str) -> tuple:
+    """
+    returns (S_len, max_distance) reduced so that count_skippy_indices fits max_candidates, as gen2_ngrams.fit_skippy_budget does:
+    "window" narrows max_distance first, down to n - 1, and both policies then cut segments at the end
+    """
+    if policy == "window":
+        if max_distance is None or max_distance > S_len - 1:
+            max_distance = S_len - 1
+        while max_distance > n - 1 and count_skippy_indices (S_len, n, max_distance = max_distance) > max_candidates:
+            max_distance -= 1
+    ## the count grows with S_len, so the longest fitting input is found by bisection
+    lo, hi = 0, S_len
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count_skippy_indices (mid, n, max_distance = max_distance) <= max_candidates:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo, max_distance
+
+##
+def gen_skippy_ngrams_in_budget (S: list, n: int, gen, budget, max_distance = None, check: bool = False) -> list:
+    """
+    returns the n-grams that gen(S, max_distance) yields, one per position tuple, within the limits of a gen2_ngrams.GenBudget
+    """
+    S_len = len(S)
+    n_candidates = count_skippy_indices (S_len, n, max_distance = max_distance)
+    action = budget.begin(n_candidates)
+    if action == "skip":
+        budget.end(0, 0)
+        return [ ]
+    if action is not None:
+        S_len, max_distance = fit_skippy_budget (S_len, n, max_distance, budget.max_candidates, action)
+        budget.hits[-1].update(n_segs = S_len, max_distance = max_distance)
+        if action == "window" and S_len < len(S):
+            budget.record("candidates", "truncate", n_candidates = n_candidates, n_segs = S_len, max_distance = max_distance)
+        if check:
+            print(f"#{action}: S_len = {S_len}, max_distance = {max_distance}")
+        if S_len < n:
+            budget.end(0, 0)
+            return [ ]
+        S = S[:S_len]
+        n_candidates = count_skippy_indices (S_len, n, max_distance = max_distance)
+    ##
+    O = [ ]
+    for r in gen(S, max_distance):
+        reason = budget.exceeded(len(O))
+        if reason is not None:
+            if budget.policy == "skip":
+                budget.record(reason, "skip", n_candidates = n_candidates)
+                O = [ ]
+            else:
+                budget.record(reason, "truncate", n_candidates = n_candidates)
+            break
+        O.append(r)
+    budget.end(n_candidates, len(O))
+    return O
+
+##
+def gen_skippy_ngrams (S: list, n: int, max_distance = None, sep: str = " ", missing_mark: str = "…", as_list: bool = False, budget = None, check: bool = False):
+    """
+    takes a list of segments and returns a list of skippy n-grams out of them.
+    budget is a gen2_ngrams.GenBudget to limit generation with, where "window" narrows max_distance
+    and "truncate" cuts segments at the end, as in gen2_ngrams.
     """
     ##
     assert n > 0
@@ -200,64 +267,59 @@ def gen_skippy_ngrams (S: list, n: int, max_distance = None, sep: str = " ", mis
         else:
             return [ sep.join(S) ]
     
-    ## generate target index list
-    S_len = len(S)
-    R = range(S_len)
-    ##P = itertools.combinations(I, r = n) # turned out to be offensive
-    ## [ x for x in ...] is necessary as in the following
-    ## implementation of restriction by max gap distance
-    if max_distance is None: ## max_distance-free
-        P = [ x for x in itertools.combinations(R, r = n) if max(x) <= S_len ]
-    else: ## max_distance implementation
-        Rx = [[ x for x in itertools.combinations(range(i, i + max_distance + 1), n) if max(x) < len(S) ] for i in R ]
-        ## flatten U
-        P = [ ]
-        for rx in Rx:
-            P.extend(rx)
     ##
+    if budget is None:
+        return list(iter_skippy_ngrams (S, n, max_distance = max_distance, sep = sep, missing_mark = missing_mark, as_list = as_list))
+    gen = lambda S, max_distance: iter_skippy_ngrams (S, n, max_distance = max_distance, sep = sep, missing_mark = missing_mark, as_list = as_list)
+    return gen_skippy_ngrams_in_budget (S, n, gen, budget, max_distance = max_distance, check = check)
+
+##
+def iter_skippy_ngrams (S: list, n: int, max_distance = None, sep: str = " ", missing_mark: str = "…", as_list: bool = False, check: bool = False):
+    """
+    takes a list of segments and yields skippy n-grams out of them one by one
+    """
+    ##
+    assert n > 0
     if check:
-        print(f"#P: {P}")
+        print(f"#S: {S}")
+    #
+    if len(S) <= n:
+        if as_list:
+            yield S
+        else:
+            yield sep.join(S)
+        return
+
+    ## generate target index list lazily, with no duplicates under max_distance
+    S_len = len(S)
+    P = iter_skippy_indices (S_len, n, max_distance = max_distance)
+
     ## generate substrings
-    Q = [ ]
     for p in P:
-        q = [ ]
-        for j in range(len(p)):
+        if check:
+            print(f"#p: {p}")
+        ## the first position starts q, and a gap goes before each later one not adjacent to its predecessor in p
+        q = [ S[p[0]] ]
+        for j in range(1, len(p)):
             i = p[j]
-            seg = S[i]
-            if i == 0:
-                q.append(seg)
-                last_i = 0
-            else:
-                if last_i + 1 == i:
-                    q.append(seg)
-                else:
-                    q.append(missing_mark)
-                    q.append(seg)
-                last_i = i
-        #
-        Q.append(q)
-    
-    ## return result
-    if as_list: ## result is a list of unstrung lists
-        return Q
-    else: ## result is a list of strings
-        R = [ ]
-        for q in Q:
-            ## remove the intial missing_mark wrongly generated
-            if q[0] == missing_mark:
-                R.append(q[1:])
-            else:
-                R.append(q)
-        #
-        return ([ sep.join(r) for r in R ])
+            if p[j - 1] + 1 != i:
+                q.append(missing_mark)
+            q.append(S[i])
+        ##
+        if as_list: ## result is unstrung lists
+            yield q
+        else: ## result is strings
+            yield sep.join(q)
 
 ## alias
 gen_sk_ngrams = gen_skippy_ngrams
+iter_sk_ngrams = iter_skippy_ngrams
 
 ##
-def gen_extended_skippy_ngrams (S: list, n: int, max_distance = None, sep: str = " ", missing_mark: str = "…", as_list: bool = False, check: bool = False):
+def gen_extended_skippy_ngrams (S: list, n: int, max_distance = None, sep: str = " ", missing_mark: str = "…", as_list: bool = False, budget = None, check: bool = False):
     """
-    takes a list of segments and returns a list of skippy n-grams out of them
+    takes a list of segments and returns a list of skippy n-grams out of them.
+    budget is a gen2_ngrams.GenBudget to limit generation with, as in gen_skippy_ngrams.
     """
     ##
     assert n > 0
@@ -269,31 +331,27 @@ def gen_extended_skippy_ngrams (S: list, n: int, max_distance = None, sep: str =
             return [ S ]
         else:
             return [ sep.join(S) ]
-    
+
+    ##
+    if budget is None:
+        return list(iter_extended_skippy_ngrams (S, n, max_distance = max_distance, sep = sep, missing_mark = missing_mark, as_list = as_list, check = check))
+    gen = lambda S, max_distance: iter_extended_skippy_ngrams (S, n, max_distance = max_distance, sep = sep, missing_mark = missing_mark, as_list = as_list, check = check)
+    return gen_skippy_ngrams_in_budget (S, n, gen, budget, max_distance = max_distance, check = check)
+
+##
+def iter_extended_skippy_ngrams (S: list, n: int, max_distance = None, sep: str = " ", missing_mark: str = "…", as_list: bool = False, check: bool = False):
+    """
+    takes a list of more than n segments and yields extended skippy n-grams out of them one by one
+    """
     ## generate target index list
     S_len = len(S)
     end_pos = (S_len - 1)
     if check:
         print(f"S_len: {S_len}")
-    ##
-    R = range(S_len)
-    ##P = itertools.combinations(I, r = n) # turned out to be offensive
-    ## [ x for x in ...] is necessary as in the following
-    ## implementation of restriction by max gap distance
-    if max_distance is None: ## max_distance-free
-        P = [ x for x in itertools.combinations(R, r = n) if max(x) <= S_len ]
-    else: ## max_distance implementation
-        Rx = [[ x for x in itertools.combinations(range(i, i + max_distance + 1), n) if max(x) < len(S) ] for i in R ]
-        ## flatten U
-        P = [ ]
-        for rx in Rx:
-            P.extend(rx)
-    ##
-    if check:
-        print(f"#P: {P}")
+    ## implementation of restriction by max gap distance, with no duplicates
+    P = iter_skippy_indices (S_len, n, max_distance = max_distance)
     
     ## generate substrings
-    Q = [ ]
     for p in P:
         if check:
             print(f"#p: {p}")
@@ -366,14 +424,11 @@ def gen_extended_skippy_ngrams (S: list, n: int, max_distance = None, sep: str =
                 q2.append(x)
             last = x
         q = q2
-        ## update
-        Q.append(q)
-    
-    ## return result
-    if as_list: ## result is a list of unstrung lists
-        return Q
-    else: ## result is a list of strings
-        return [ sep.join(q) for q in Q ]
+        ##
+        if as_list: ## result is an unstrung list
+            yield q
+        else: ## result is a string
+            yield sep.join(q)
 
 ## alias
 gen_ext_skippy_ngrams = gen_extended_skippy_ngrams
@@ -390,7 +445,8 @@ sk_ngram_size = skippy_ngram_size
 ##
 def gen_skippy_ngrams_from_str (text: str, n: int, sep: str = " ", missing_mark: str = "…", max_distance = None, as_list: bool = False, check: bool = False):
     """
-    takes a string and returns a list of skippy n-grams out of segments generated the using separator
+    takes a string and returns a list of skippy n-grams out of segments generated using the separator, as gen_skippy_ngrams does.
+    With sep = "", segments are characters, and n-grams are made of slices of the string with no segment lists built.
     """
     assert n > 0
     ## split into segments
@@ -399,27 +455,16 @@ def gen_skippy_ngrams_from_str (text: str, n: int, sep: str = " ", missing_mark:
         print(f"#S: {S}")
     if len(S) <= n:
         if as_list:
-            return S
+            return [ S ]
         else:
-            return text
-    ## generate target index list
-    I = range(len(S))
-    ##
-    if max_distance is None:
-        ##P = itertools.combinations(I, r = n) # turned out to be offensive
-        ## [ x for x in ...] is necessary as in the following
-        #P = [ x for x in itertools.combinations(I, r = n) ]
-        P = list(itertools.combinations(I, r = n))  # suggested by Pylint
-    else:
-        Rx = [[ x for x in itertools.combinations(range(i, i + max_distance), n) if max(x) < len(S) ] for i in I ]
-        ## flatten U
-        P = [ ]
-        for rx in Rx:
-            P.extend(rx)
-    if check:
-        print(f"#P: {P}")
+            return [ sep.join(S) ]
+    ## characters are taken from the string itself
+    if sep == "" and not as_list:
+        S = "".join(S)
+    ## generate target index list, with no duplicates under max_distance
+    P = iter_skippy_indices (len(S), n, max_distance = max_distance)
     ## generate substrings
-    return make_substrings (P)
+    return make_substrings (S, P, sep = sep, missing_mark = missing_mark, as_list = as_list, check = check)
 
 ##
 def main():
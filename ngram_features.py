@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+
+"""
+ngram_features.py
+
+This is a builder of document-term matrices of normal and skippy n-grams for topic models and classifiers, such as those in LDA-mixed-terms and self-supervised-word-classification. A corpus goes straight to a matrix in CSR form (data, indices and indptr arrays, or a scipy.sparse matrix) in one pass, where n-grams are counted as tuples of integer ids rather than as strings.
+
+Creation
+2026/10/17
+"""
+
+import gen2_ngrams
+
+##
+def count_doc_features(segs: list, n_for_ngram: int, vocab: dict, max_gap_size: int = None, extended: bool = True, inclusive: bool = True, normal: bool = True, skippy: bool = True) -> dict:
+
+    """
+    returns a dict from id tuples of n-grams in a list of segments to their numbers of occurrences.
+    Normal n-grams count contiguous sequences, and skippy n-grams add the ones with gaps
+    (gapless skippy n-grams are contiguous sequences already counted as normal ones).
+    Lists shorter than n_for_ngram are handled at their own length, as the command line of gen2_ngrams.py does.
+    """
+
+    n_for_ngram = min(n_for_ngram, len(segs))
+    C = { }
+    if normal:
+        for g in gen2_ngrams.iter_ngrams(segs, n_for_ngram, inclusive = inclusive, vocab = vocab):
+            C[g] = C.get(g, 0) + 1
+    if skippy:
+        for g, c in gen2_ngrams.count_skippy_ngrams(segs, n_for_ngram, max_gap_size = max_gap_size, extended = extended, inclusive = inclusive, vocab = vocab).items():
+            if normal and gen2_ngrams.GAP_ID not in g:
+                continue
+            C[g] = C.get(g, 0) + c
+    return C
+
+##
+def make_csr(data, indices, indptr, shape: tuple, as_scipy: bool = False):
+
+    """
+    returns CSR arrays as a scipy.sparse.csr_matrix if as_scipy = True, or otherwise as a tuple (data, indices, indptr)
+    of NumPy arrays if NumPy is available, and of array.array otherwise
+    """
+
+    if as_scipy:
+        import numpy as np
+        import scipy.sparse
+        return scipy.sparse.csr_matrix((np.frombuffer(data, dtype = np.int64), np.frombuffer(indices, dtype = np.int64), np.frombuffer(indptr, dtype = np.int64)), shape = shape)
+    try:
+        import numpy as np
+        return (np.frombuffer(data, dtype = np.int64), np.frombuffer(indices, dtype = np.int64), np.frombuffer(indptr, dtype = np.int64))
+    except ImportError:
+        return (data, indices, indptr)
+
+##
+def build_ngram_matrix(docs, n_for_ngram: int, max_gap_size: int = None, extended: bool = True, inclusive: bool = True, normal: bool = True, skippy: bool = True, pattern: str = r"", sep: str = " ", gap_mark: str = "…", as_scipy: bool = False, check: bool = False):
+
+    """
+    takes an iterable of documents, either strings to segment with pattern (a regex or a Segmenter) or lists of segments,
+    and returns (matrix, features), where features is a list of n-grams joined by sep for the columns.
+    matrix is a scipy.sparse.csr_matrix if as_scipy = True, or otherwise a tuple (data, indices, indptr)
+    of arrays, which are NumPy arrays if NumPy is available and array.array otherwise.
+    """
+
+    import array
+    vocab = gen2_ngrams.make_vocab(gap_mark)
+    columns = { }
+    data = array.array("q")
+    indices = array.array("q")
+    indptr = array.array("q", [ 0 ])
+
+    ## one pass over documents
+    for i, doc in enumerate(docs):
+        if type(doc) is str:
+            doc = gen2_ngrams.segment(doc, pattern)
+        if len(doc) > 0:
+            C = count_doc_features(doc, n_for_ngram, vocab, max_gap_size = max_gap_size, extended = extended, inclusive = inclusive, normal = normal, skippy = skippy)
+        else:
+            C = { }
+        row = sorted( (columns.setdefault(g, len(columns)), c) for g, c in C.items() )
+        for j, c in row:
+            indices.append(j)
+            data.append(c)
+        indptr.append(len(indices))
+        if check:
+            print(f"#doc {i}: {len(row)} features")
+
+    ## feature names
+    inverted_vocab = gen2_ngrams.invert_vocab(vocab)
+    features = [ gen2_ngrams.decode_ngram(g, inverted_vocab, sep = sep) for g in columns ]
+    shape = (len(indptr) - 1, len(features))
+    return make_csr(data, indices, indptr, shape, as_scipy = as_scipy), features
+
+## constants of stable hashing; Python's own hash(..) of strings differs between processes
+hash_mask = (1 << 64) - 1
+hash_base = 0x100000001b3
+hash_mix = 0x9e3779b97f4a7c15
+gap_hash = 0x5bd1e9955bd1e995
+
+##
+def hash_segment(seg: str) -> int:
+
+    """
+    returns a stable 64-bit hash of a segment
+    """
+
+    import hashlib
+    return int.from_bytes(hashlib.blake2b(seg.encode("utf-8"), digest_size = 8).digest(), "little")
+
+##
+def combine_hashes(H) -> int:
+
+    """
+    returns the hash of a sequence from hashes of its elements, as a polynomial in hash_base,
+    so that the hash of a sequence extended by a gap is computed from that of the sequence
+    """
+
+    h = 0
+    for x in H:
+        h = (h * hash_base + x) & hash_mask
+    return h
+
+##
+def to_bucket(h: int, n_bits: int) -> tuple:
+
+    """
+    returns a bucket index out of 2 ** n_bits and a sign (1 or -1) for a hash
+    """
+
+    m = (h * hash_mix) & hash_mask
+    return m >> (64 - n_bits), 1 - 2 * (m & 1)
+
+##
+def hash_skippy_ngrams(L: list, n_for_ngram: int, max_gap_size: int = None, extended: bool = True, inclusive: bool = True, recursively: bool = True, n_bits: int = 20, signed: bool = False, seg_hashes: dict = None, gap_mark: str = "…", check: bool = False):
+
+    """
+    returns an array of bucket indices out of 2 ** n_bits for the skippy n-grams of gen_skippy_ngrams(..),
+    in the same order, without building the n-grams. Hashes are combined from hashes of segments along
+    the position templates, and gaps have gap_hash. With signed = True, (indices, signs) are returned,
+    where signs are 1 or -1. seg_hashes is a dict to keep hashes of segments across calls.
+    """
+
+    import array
+    assert 0 < n_bits <= 62
+    if seg_hashes is None:
+        seg_hashes = { }
+    def get_hash(seg):
+        x = seg_hashes.get(seg)
+        if x is None:
+            x = seg_hashes[seg] = hash_segment(seg)
+        return x
+
+    ## hashes of n-grams
+    base_segs = [ seg for seg in L if len(seg) > 0 ]
+    ## lists shorter than n_for_ngram are handled at their own length, as in count_doc_features(..)
+    if recursively and len(base_segs) > 0:
+        n_for_ngram = min(n_for_ngram, len(base_segs))
+    if len(base_segs) == 0:
+        kept = [ ]
+    elif len(base_segs) < n_for_ngram:
+        ## short inputs have a single n-gram only, which is hashed as it is
+        G = gen2_ngrams.gen_skippy_ngrams(base_segs, n_for_ngram, max_gap_size = max_gap_size, extended = extended, inclusive = inclusive, recursively = recursively, gap_mark = gap_mark, as_list = True, check = check)
+        kept = [ combine_hashes( gap_hash if seg == gap_mark else get_hash(seg) for seg in g ) for g in G ]
+    else:
+        X = [ get_hash(seg) for seg in base_segs ] + [ gap_hash ]
+        K = [ (combine_hashes(map(X.__getitem__, t)), len(t)) for t in gen2_ngrams.iter_skippy_templates(len(base_segs), n_for_ngram, max_gap_size, extended = extended, inclusive = inclusive) ]
+        Q = { h for h, _ in K }
+        ## remove overgenerated n-grams, whose extensions by a gap are present, as iter_skippy_ngrams(..) does
+        seen = set()
+        kept = [ ]
+        for h, k in K:
+            if h in seen:
+                continue
+            seen.add(h)
+            if (h * hash_base + gap_hash) & hash_mask in Q or (gap_hash * pow(hash_base, k, 1 << 64) + h) & hash_mask in Q:
+                continue
+            kept.append(h)
+
+    ##
+    indices = array.array("q")
+    signs = array.array("b")
+    for h in kept:
+        i, sign = to_bucket(h, n_bits)
+        indices.append(i)
+        signs.append(sign)
+    if check:
+        print(f"#indices [size: {len(indices)}]: {indices.tolist()}")
+    if signed:
+        return indices, signs
+    return indices
+
+##
+def build_hashed_matrix(docs, n_for_ngram: int, max_gap_size: int = None, extended: bool = True, inclusive: bool = True, n_bits: int = 20, signed: bool = False, pattern: str = r"", as_scipy: bool = False, check: bool = False):
+
+    """
+    takes an iterable of documents, either strings to segment with pattern (a regex or a Segmenter) or lists of segments,
+    and returns a matrix of skippy n-grams hashed into 2 ** n_bits columns, in the same forms as build_ngram_matrix(..).
+    Each n-gram of a document adds 1 (or its sign, if signed = True) to its column.
+    """
+
+    import array
+    seg_hashes = { }
+    data = array.array("q")
+    indices = array.array("q")
+    indptr = array.array("q", [ 0 ])
+    for i, doc in enumerate(docs):
+        if type(doc) is str:
+            doc = gen2_ngrams.segment(doc, pattern)
+        C = { }
+        if len(doc) > 0:
+            I, S = hash_skippy_ngrams(doc, n_for_ngram, max_gap_size = max_gap_size, extended = extended, inclusive = inclusive, n_bits = n_bits, signed = True, seg_hashes = seg_hashes)
+            for j, sign in zip(I, S):
+                C[j] = C.get(j, 0) + (sign if signed else 1)
+        for j in sorted(C):
+            if C[j] != 0:
+                indices.append(j)
+                data.append(C[j])
+        indptr.append(len(indices))
+        if check:
+            print(f"#doc {i}: {len(C)} buckets")
+    return make_csr(data, indices, indptr, (len(indptr) - 1, 1 << n_bits), as_scipy = as_scipy)
+
+### end of file
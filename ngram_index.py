@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+
+"""
+ngram_index.py
+
+This is an index of n-grams of a corpus built on gen2_ngrams.py, which is kept up to date as documents come and go, so that appending documents to a corpus does not require recounting it from scratch, and an inverted index from n-grams to the documents (and positions) where they occur. Counts are kept for tuples of integer ids over a shared vocabulary, as in ngram_features.py.
+
+Creation
+2026/10/17
+"""
+
+import gen2_ngrams
+import ngram_features
+
+##
+def encode_ngram(gram, vocab: dict, sep: str = " ") -> tuple:
+
+    """
+    returns the id tuple of an n-gram, joined by sep or given as a list, without adding to vocab,
+    or None if it has unknown segments
+    """
+
+    if type(gram) is str:
+        gram = gram.split(sep) if len(sep) > 0 else list(gram)
+    ids = tuple( vocab.get(seg) for seg in gram )
+    if None in ids:
+        return None
+    return ids
+
+##
+class NgramIndex:
+
+    """
+    counts of normal and skippy n-grams of a corpus, with the numbers of documents that contain them.
+    add(doc) and remove(doc) update counts by the n-grams of a single document, either a string to segment
+    with pattern (a regex or a Segmenter) or a list of segments, and snapshot() and restore(..) save and bring back a state.
+    """
+
+    def __init__(self, n_for_ngram: int, max_gap_size: int = None, extended: bool = True, inclusive: bool = True, normal: bool = True, skippy: bool = True, pattern = r"", sep: str = " ", gap_mark: str = "…"):
+        self.params = dict(max_gap_size = max_gap_size, extended = extended, inclusive = inclusive, normal = normal, skippy = skippy)
+        self.n_for_ngram = n_for_ngram
+        self.pattern = pattern
+        self.sep = sep
+        self.gap_mark = gap_mark
+        self.vocab = gen2_ngrams.make_vocab(gap_mark)
+        self.counts = { }
+        self.doc_freqs = { }
+        self.n_docs = 0
+
+    def segment_doc(self, doc) -> list:
+        """returns the segments of a document"""
+        if type(doc) is str:
+            return gen2_ngrams.segment(doc, self.pattern)
+        return [ seg for seg in doc if len(seg) > 0 ]
+
+    def count_doc(self, doc) -> dict:
+        """returns counts of n-grams of a document, keyed on id tuples"""
+        doc = self.segment_doc(doc)
+        if len(doc) == 0:
+            return { }
+        return ngram_features.count_doc_features(doc, self.n_for_ngram, self.vocab, **self.params)
+
+    def add(self, doc) -> int:
+        """adds n-grams of a document and returns the number of distinct n-grams in it"""
+        C = self.count_doc(doc)
+        counts, doc_freqs = self.counts, self.doc_freqs
+        for g, c in C.items():
+            counts[g] = counts.get(g, 0) + c
+            doc_freqs[g] = doc_freqs.get(g, 0) + 1
+        self.n_docs += 1
+        return len(C)
+
+    def remove(self, doc) -> int:
+        """
+        removes n-grams of a document added earlier and returns the number of distinct n-grams in it.
+        A ValueError is raised, with the index unchanged, if the document cannot have been added.
+        """
+        segs = self.segment_doc(doc)
+        ## unknown segments would be added to vocab by counting
+        if self.n_docs == 0 or any( seg not in self.vocab for seg in segs ):
+            raise ValueError(f"document is not in the index: {doc!r}")
+        C = self.count_doc(segs)
+        counts, doc_freqs = self.counts, self.doc_freqs
+        if any( counts.get(g, 0) < c for g, c in C.items() ):
+            raise ValueError(f"document is not in the index: {doc!r}")
+        for g, c in C.items():
+            if counts[g] == c:
+                del counts[g]
+                del doc_freqs[g]
+            else:
+                counts[g] -= c
+                doc_freqs[g] -= 1
+        self.n_docs -= 1
+        return len(C)
+
+    def update(self, docs):
+        """adds n-grams of documents one by one"""
+        for doc in docs:
+            self.add(doc)
+
+    def encode(self, gram) -> tuple:
+        """returns the id tuple of an n-gram, joined by sep or given as a list, or None if it has unknown segments"""
+        return encode_ngram(gram, self.vocab, sep = self.sep)
+
+    def get(self, gram) -> int:
+        """returns the count of an n-gram"""
+        return self.counts.get(self.encode(gram), 0)
+
+    def get_doc_freq(self, gram) -> int:
+        """returns the number of documents that contain an n-gram"""
+        return self.doc_freqs.get(self.encode(gram), 0)
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def __contains__(self, gram) -> bool:
+        return self.encode(gram) in self.counts
+
+    def items(self):
+        """yields (n-gram, count) pairs, where n-grams are joined by sep"""
+        inverted_vocab = gen2_ngrams.invert_vocab(self.vocab)
+        for g, c in self.counts.items():
+            yield gen2_ngrams.decode_ngram(g, inverted_vocab, sep = self.sep), c
+
+    def most_common(self, k: int = None) -> list:
+        """returns the k most frequent (n-gram, count) pairs, or all of them"""
+        import heapq
+        inverted_vocab = gen2_ngrams.invert_vocab(self.vocab)
+        if k is None:
+            G = sorted(self.counts.items(), key = lambda x: x[1], reverse = True)
+        else:
+            G = heapq.nlargest(k, self.counts.items(), key = lambda x: x[1])
+        return [ (gen2_ngrams.decode_ngram(g, inverted_vocab, sep = self.sep), c) for g, c in G ]
+
+    def snapshot(self) -> dict:
+        """returns a copy of the state, which can be pickled and given to restore(..)"""
+        return { "vocab": dict(self.vocab), "counts": dict(self.counts), "doc_freqs": dict(self.doc_freqs), "n_docs": self.n_docs }
+
+    def restore(self, state: dict):
+        """brings back a state returned by snapshot()"""
+        self.vocab = dict(state["vocab"])
+        self.counts = dict(state["counts"])
+        self.doc_freqs = dict(state["doc_freqs"])
+        self.n_docs = state["n_docs"]
+
+##
+def append_varint(buf: bytearray, x: int):
+
+    """
+    appends a non-negative integer to buf in LEB128, i.e., 7 bits per byte with the high bit set on all but the last byte
+    """
+
+    while x >= 0x80:
+        buf.append((x & 0x7f) | 0x80)
+        x >>= 7
+    buf.append(x)
+
+##
+def decode_deltas(buf: bytes) -> list:
+
+    """
+    returns the integers of a sequence of delta-encoded varints, i.e., their running sums
+    """
+
+    R = [ ]
+    x, shift, last = 0, 0, 0
+    for b in buf:
+        x |= (b & 0x7f) << shift
+        if b & 0x80:
+            shift += 7
+        else:
+            last += x
+            R.append(last)
+            x, shift = 0, 0
+    return R
+
+##
+class InvertedIndex:
+
+    """
+    an inverted index from normal and skippy n-grams to the documents that contain them, built while n-grams are generated.
+    add(doc) gives a document the next id and adds it to the posting lists of its n-grams, which are kept as
+    delta-encoded varints. With positions = True, the positions of the segments of every occurrence are kept as well.
+    lookup(gram) returns the ids of documents with an n-gram, joined by sep or given as a list, and lookup_all(grams)
+    those with all of them.
+    """
+
+    def __init__(self, n_for_ngram: int, max_gap_size: int = None, extended: bool = True, inclusive: bool = True, normal: bool = True, skippy: bool = True, positions: bool = False, pattern = r"", sep: str = " ", gap_mark: str = "…"):
+        self.n_for_ngram = n_for_ngram
+        self.max_gap_size = max_gap_size
+        self.extended = extended
+        self.inclusive = inclusive
+        self.normal = normal
+        self.skippy = skippy
+        self.positions = positions
+        self.pattern = pattern
+        self.sep = sep
+        self.gap_mark = gap_mark
+        self.vocab = gen2_ngrams.make_vocab(gap_mark)
+        self.postings = { }
+        self.last_ids = { }
+        self.occurrences = { }
+        self.n_docs = 0
+
+    def iter_occurrences(self, segs: list):
+        """yields (key, positions) of all occurrences of n-grams in a list of segments"""
+        n_for_ngram = min(self.n_for_ngram, len(segs))
+        if self.normal:
+            sizes = range(1, n_for_ngram + 1) if self.inclusive else [ n_for_ngram ]
+            ids = gen2_ngrams.encode_segs(segs, self.vocab)
+            for j in sizes:
+                for i in range(len(ids) - j + 1):
+                    yield ids[i : i + j], tuple(range(i, i + j))
+        if self.skippy:
+            for key, p in gen2_ngrams.iter_skippy_ngram_occurrences(segs, n_for_ngram, self.max_gap_size, extended = self.extended, inclusive = self.inclusive, vocab = self.vocab):
+                ## gapless skippy n-grams are normal ones
+                if self.normal and gen2_ngrams.GAP_ID not in key:
+                    continue
+                yield key, p
+
+    def add(self, doc) -> int:
+        """adds a document, either a string to segment with pattern (a regex or a Segmenter) or a list of segments, and returns its id"""
+        doc_id = self.n_docs
+        self.n_docs += 1
+        if type(doc) is str:
+            doc = gen2_ngrams.segment(doc, self.pattern)
+        else:
+            doc = [ seg for seg in doc if len(seg) > 0 ]
+        if len(doc) == 0:
+            return doc_id
+        postings, last_ids, occurrences = self.postings, self.last_ids, self.occurrences
+        for key, p in self.iter_occurrences(doc):
+            last = last_ids.get(key)
+            if last != doc_id:
+                buf = postings.get(key)
+                if buf is None:
+                    buf = postings[key] = bytearray()
+                    last = 0
+                append_varint(buf, doc_id - last)
+                last_ids[key] = doc_id
+            if self.positions:
+                occurrences.setdefault(key, { }).setdefault(doc_id, [ ]).append(p)
+        return doc_id
+
+    def update(self, docs) -> list:
+        """adds documents one by one and returns their ids"""
+        return [ self.add(doc) for doc in docs ]
+
+    def encode(self, gram) -> tuple:
+        """returns the id tuple of an n-gram, joined by sep or given as a list, or None if it has unknown segments"""
+        return encode_ngram(gram, self.vocab, sep = self.sep)
+
+    def lookup(self, gram) -> list:
+        """returns the ids of documents that contain an n-gram, in increasing order"""
+        buf = self.postings.get(self.encode(gram))
+        if buf is None:
+            return [ ]
+        return decode_deltas(buf)
+
+    def lookup_all(self, grams: list) -> list:
+        """returns the ids of documents that contain all of the n-grams, starting from the shortest posting list"""
+        keys = [ self.encode(gram) for gram in grams ]
+        if len(keys) == 0 or any( key not in self.postings for key in keys ):
+            return [ ]
+        keys.sort(key = lambda key: len(self.postings[key]))
+        R = set(decode_deltas(self.postings[keys[0]]))
+        for key in keys[1:]:
+            R.intersection_update(decode_deltas(self.postings[key]))
+            if len(R) == 0:
+                break
+        return sorted(R)
+
+    def lookup_positions(self, gram) -> dict:
+        """returns a dict from ids of documents with an n-gram to the positions of its segments in each occurrence"""
+        assert self.positions, "positions are not kept; use positions = True"
+        return dict(self.occurrences.get(self.encode(gram), { }))
+
+    def get_doc_freq(self, gram) -> int:
+        """returns the number of documents that contain an n-gram"""
+        buf = self.postings.get(self.encode(gram))
+        if buf is None:
+            return 0
+        ## every varint ends in a byte without the high bit
+        return sum( 1 for b in buf if b < 0x80 )
+
+    def __len__(self) -> int:
+        return len(self.postings)
+
+    def __contains__(self, gram) -> bool:
+        return self.encode(gram) in self.postings
+
+    def size_in_bytes(self) -> int:
+        """returns the total size of posting lists"""
+        return sum( len(buf) for buf in self.postings.values() )
+
+### end of file
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+
+"""
+ngram_match.py
+
+This is a matcher of skippy patterns such as "a … c d" against sequences of segments, which finds where patterns occur without generating all skippy n-grams of a document by gen2_ngrams.py. Patterns follow the semantics of gen2_ngrams.gen_skippy_ngrams(..): a gap stands for one or more segments, a span (gaps at the ends included) is at most max_gap_size + 2 segments long, and gaps at the ends are allowed in extended mode only.
+
+Patterns are compiled into a table keyed on their first segments, so that a document is scanned once for all patterns, and only the patterns that start with the segment at hand are tried at each position.
+
+Creation
+2026/10/17
+"""
+
+import gen2_ngrams
+
+##
+class SkippyPattern:
+
+    """
+    a compiled skippy pattern: runs of contiguous segments separated by gaps, with flags of gaps at the ends
+    """
+
+    __slots__ = ("text", "segs", "runs", "lead", "trail", "n_segs")
+
+    def __init__(self, text: str, segs: list, gap_mark: str = "…"):
+        self.text = text
+        self.segs = gen2_ngrams.simplify_gaps([ seg for seg in segs if len(seg) > 0 ], gap_mark)
+        if all( seg == gap_mark for seg in self.segs ):
+            raise ValueError(f"pattern has no segments: {text!r}")
+        self.lead = self.segs[0] == gap_mark
+        self.trail = self.segs[-1] == gap_mark
+        self.runs = [ ]
+        run = [ ]
+        for seg in self.segs:
+            if seg == gap_mark:
+                if len(run) > 0:
+                    self.runs.append(tuple(run))
+                run = [ ]
+            else:
+                run.append(seg)
+        if len(run) > 0:
+            self.runs.append(tuple(run))
+        self.n_segs = sum( len(run) for run in self.runs )
+
+##
+class SkippyMatcher:
+
+    """
+    finds occurrences of many skippy patterns in documents in a single scan per document.
+    Patterns are strings joined by sep or lists of segments, and documents are strings to segment with pattern
+    (a regex or a Segmenter) or lists of segments. An occurrence is the tuple of positions of the segments of a pattern.
+    With as_generated = True, a pattern is reported in a document only if gen_skippy_ngrams(..) of that document
+    would give it, i.e., unless the pattern extended by a gap at either end occurs as well.
+    """
+
+    def __init__(self, patterns: list, max_gap_size: int = None, extended: bool = True, as_generated: bool = False, sep: str = " ", gap_mark: str = "…", pattern = r""):
+        self.max_gap_size = max_gap_size
+        self.extended = extended
+        self.as_generated = as_generated
+        self.sep = sep
+        self.gap_mark = gap_mark
+        self.pattern = pattern
+        self.patterns = [ ]
+        self.table = { }
+        for p in patterns:
+            if type(p) is str:
+                P = SkippyPattern(p, p.split(sep) if len(sep) > 0 else list(p), gap_mark)
+            else:
+                P = SkippyPattern(sep.join(p), p, gap_mark)
+            if not extended and (P.lead or P.trail):
+                raise ValueError(f"pattern with a gap at an end needs extended = True: {P.text!r}")
+            self.patterns.append(P)
+            self.table.setdefault(P.runs[0][0], [ ]).append(P)
+
+    def match_at(self, segs: list, P: SkippyPattern, i: int):
+        """yields occurrences of a pattern whose first segment is at position i"""
+        n_segs = len(segs)
+        if P.lead and i == 0:
+            return
+        ## the span of an occurrence covers its segments and one position per gap at the ends
+        max_last = n_segs - 2 if P.trail else n_segs - 1
+        if self.max_gap_size is not None:
+            max_last = min(max_last, i + self.max_gap_size + 1 - P.lead - P.trail)
+        ## extended mode does not give unigrams without gaps
+        if self.extended and P.n_segs == 1 and not (P.lead or P.trail):
+            return
+        runs = P.runs
+        def walk(r: int, start: int, positions: tuple):
+            run = runs[r]
+            end = start + len(run)
+            if end - 1 > max_last or tuple(segs[start:end]) != run:
+                return
+            positions = positions + tuple(range(start, end))
+            if r + 1 == len(runs):
+                yield positions
+                return
+            ## a gap skips one or more segments
+            for j in range(end + 1, max_last + 1):
+                yield from walk(r + 1, j, positions)
+        yield from walk(0, i, ())
+
+    def match(self, doc) -> dict:
+        """returns a dict from patterns (joined by sep) to lists of their occurrences in a document, for matched patterns only"""
+        if type(doc) is str:
+            doc = gen2_ngrams.segment(doc, self.pattern)
+        else:
+            doc = [ seg for seg in doc if len(seg) > 0 ]
+        R = { }
+        for i, seg in enumerate(doc):
+            for P in self.table.get(seg, ()):
+                for positions in self.match_at(doc, P, i):
+                    R.setdefault(P, [ ]).append(positions)
+        return { P.text: M for P, M in R.items() if not (self.as_generated and self.is_overgenerated(doc, P)) }
+
+    def is_overgenerated(self, segs: list, P: SkippyPattern) -> bool:
+        """tells if a pattern extended by a gap at either end occurs in a list of segments"""
+        if not self.extended:
+            return False
+        for Q in (SkippyPattern(P.text, P.segs + [ self.gap_mark ], self.gap_mark), SkippyPattern(P.text, [ self.gap_mark ] + P.segs, self.gap_mark)):
+            if Q.segs == P.segs:
+                continue
+            for i, seg in enumerate(segs):
+                if seg == Q.runs[0][0] and next(self.match_at(segs, Q, i), None) is not None:
+                    return True
+        return False
+
+    def iter_matches(self, docs):
+        """yields (index, matches) of documents one by one, where matches is given by match(..)"""
+        for i, doc in enumerate(docs):
+            yield i, self.match(doc)
+
+##
+def match_skippy_patterns(docs, patterns: list, max_gap_size: int = None, extended: bool = True, as_generated: bool = False, sep: str = " ", gap_mark: str = "…", pattern = r"") -> list:
+
+    """
+    returns a list of dicts from patterns to their occurrences, one per document, as SkippyMatcher(..).match(..) gives them
+    """
+
+    M = SkippyMatcher(patterns, max_gap_size = max_gap_size, extended = extended, as_generated = as_generated, sep = sep, gap_mark = gap_mark, pattern = pattern)
+    return [ M.match(doc) for doc in docs ]
+
+### end of file
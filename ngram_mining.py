@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+
+"""
+ngram_mining.py
+
+This is a miner of frequent skippy n-grams in a corpus, which grows n-grams level by level in the manner of Apriori instead of generating all skippy n-grams of every document by gen2_ngrams.py and discarding the rare ones afterwards. At level m, only occurrences of frequent (m - 1)-grams are extended by a segment, and an extension is counted only if all of its (m - 1)-sub-grams are frequent, so that rare candidates are never generated.
+
+The support of an n-gram is the number of documents in which it occurs, where occurrences follow the templates of gen2_ngrams.gen_skippy_ngrams(..): spans of at most max_gap_size + 2 segments, and gaps at the ends in extended mode only. The removal of overgenerated n-grams in gen_skippy_ngrams(..) is not applied, since support would not decrease monotonically with it.
+
+Creation
+2026/10/17
+"""
+
+import gen2_ngrams
+
+##
+def make_occurrence_key(ids: tuple, P: tuple, lead: bool, trail: bool) -> tuple:
+
+    """
+    returns the id tuple of an occurrence of segments at positions P, with gaps between separate positions and at the ends as flagged
+    """
+
+    GAP_ID = gen2_ngrams.GAP_ID
+    key = [ GAP_ID ] if lead else [ ]
+    for j, p in enumerate(P):
+        if j > 0 and p > P[j - 1] + 1:
+            key.append(GAP_ID)
+        key.append(ids[p])
+    if trail:
+        key.append(GAP_ID)
+    return tuple(key)
+
+##
+def iter_sub_occurrences(P: tuple, lead: bool, trail: bool, extended: bool):
+
+    """
+    yields the occurrences of (m - 1)-sub-grams of an occurrence of m segments, one per removed segment.
+    A segment removed from an end leaves a gap there in extended mode.
+    """
+
+    for t in range(len(P)):
+        yield P[:t] + P[t + 1:], (extended or lead) if t == 0 else lead, (extended or trail) if t == len(P) - 1 else trail
+
+##
+def mine_skippy_ngrams(docs, max_n_for_ngram: int, min_support: int, max_gap_size: int = None, extended: bool = True, inclusive: bool = True, pattern = r"", sep: str = " ", gap_mark: str = "…", check: bool = False) -> dict:
+
+    """
+    takes an iterable of documents, either strings to segment with pattern (a regex or a Segmenter) or lists of segments,
+    and returns a dict from skippy n-grams of up to max_n_for_ngram segments, joined by sep, to their supports,
+    i.e., the numbers of documents in which they occur, for those with support >= min_support.
+    With inclusive = False, n-grams of max_n_for_ngram segments only are returned.
+    """
+
+    assert max_n_for_ngram > 0 and min_support > 0
+    vocab = gen2_ngrams.make_vocab(gap_mark)
+    D = [ ]
+    for doc in docs:
+        if type(doc) is str:
+            doc = gen2_ngrams.segment(doc, pattern)
+        else:
+            doc = [ seg for seg in doc if len(seg) > 0 ]
+        D.append(gen2_ngrams.encode_segs(doc, vocab))
+
+    ## occurrences at the ends of spans
+    ends = (False, True) if extended else (False,)
+    def get_max_last(first: int, lead: bool, trail: bool, n_segs: int) -> int:
+        max_last = n_segs - 2 if trail else n_segs - 1
+        if max_gap_size is not None:
+            max_last = min(max_last, first + max_gap_size + 1 - lead - trail)
+        return max_last
+
+    ## level 1: single segments, with gaps at the ends in extended mode except for bare unigrams
+    O = [ ]
+    for ids in D:
+        n_segs = len(ids)
+        occurrences = [ ]
+        for x in range(n_segs):
+            for lead in ends:
+                for trail in ends:
+                    if extended and not (lead or trail):
+                        continue
+                    if (lead and x == 0) or get_max_last(x, lead, trail, n_segs) < x:
+                        continue
+                    occurrences.append(((x,), lead, trail))
+        O.append(occurrences)
+
+    ##
+    R = { }
+    frequent = set()
+    for m in range(1, max_n_for_ngram + 1):
+        if m > 1:
+            ## extend occurrences of frequent (m - 1)-grams that can take one more segment at the end
+            O_next = [ ]
+            for ids, occurrences in zip(D, O):
+                n_segs = len(ids)
+                extensions = [ ]
+                for P, lead, trail in occurrences:
+                    if trail != extended:
+                        continue
+                    for new_trail in ends:
+                        max_last = get_max_last(P[0], lead, new_trail, n_segs)
+                        for x in range(P[-1] + 1, max_last + 1):
+                            Q = P + (x,)
+                            ## Apriori: all sub-grams are frequent
+                            if all( make_occurrence_key(ids, *sub) in frequent for sub in iter_sub_occurrences(Q, lead, new_trail, extended) ):
+                                extensions.append((Q, lead, new_trail))
+                O_next.append(extensions)
+            O = O_next
+
+        ## supports
+        S = { }
+        for ids, occurrences in zip(D, O):
+            for key in { make_occurrence_key(ids, *o) for o in occurrences }:
+                S[key] = S.get(key, 0) + 1
+        frequent = { key for key, c in S.items() if c >= min_support }
+        if check:
+            print(f"#level {m}: {len(S)} candidates, {len(frequent)} frequent")
+        if len(frequent) == 0:
+            break
+        if inclusive or m == max_n_for_ngram:
+            for key in frequent:
+                R[key] = S[key]
+
+        ## keep occurrences of frequent n-grams only
+        O = [ [ o for o in occurrences if make_occurrence_key(ids, *o) in frequent ] for ids, occurrences in zip(D, O) ]
+
+    ##
+    inverted_vocab = gen2_ngrams.invert_vocab(vocab)
+    return { gen2_ngrams.decode_ngram(key, inverted_vocab, sep = sep): c for key, c in sorted(R.items(), key = lambda x: (-x[1], len(x[0]), x[0])) }
+
+### end of file
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+
+"""
+ngram_store.py
+
+This is a compact binary store for n-grams generated by gen2_ngrams.py, as a replacement for pickled DataFrames whose cells hold lists of strings. Grams are kept per document as arrays of integer ids over an interned vocabulary, so that a file can be memory-mapped and sliced by document without being loaded as a whole.
+
+Layout (native byte order, recorded in the header)
+header: magic, byte order, version, n_docs, n_grams, n_ids, n_vocab, n_vocab_bytes
+ids: uint32 ids of segments of all grams, where gap_mark has gen2_ngrams.GAP_ID
+gram_offsets: int64 offsets of grams into ids (n_grams + 1)
+doc_offsets: int64 offsets of documents into gram_offsets (n_docs + 1)
+vocab_offsets: int64 offsets of segments into vocab bytes (n_vocab + 1)
+vocab bytes: UTF-8 segments, where a segment of id i is at vocab_offsets[i:i + 2]
+Sections after ids are padded to 8 bytes.
+
+Creation
+2026/10/17
+"""
+
+import struct
+import gen2_ngrams
+
+## header format and size
+header_format = "=4s1sxxIQQQQQ"
+header_size = 64
+magic = b"SKNG"
+version = 1
+
+##
+def pad_to(f, size: int = 8):
+
+    """
+    pads a file being written with null bytes to a multiple of size
+    """
+
+    r = f.tell() % size
+    if r > 0:
+        f.write(b"\0" * (size - r))
+
+##
+def write_ngram_store(path: str, docs_grams, vocab: dict = None, gap_mark: str = "…") -> dict:
+
+    """
+    writes grams of documents into a store file, streaming ids document by document, and returns counts of what was written.
+    docs_grams is an iterable over documents, each a list of grams given by gen_skippy_ngrams(.., as_list = True),
+    or id tuples given by gen_skippy_ngrams(.., vocab = vocab) together with that vocab.
+    """
+
+    import array, sys
+    if vocab is None:
+        vocab = gen2_ngrams.make_vocab(gap_mark)
+        encode = lambda g: gen2_ngrams.encode_segs(g, vocab)
+    else:
+        encode = lambda g: g
+
+    ##
+    gram_offsets = array.array("q", [ 0 ])
+    doc_offsets = array.array("q", [ 0 ])
+    n_ids = 0
+    with open(path, "wb") as f:
+        f.write(b"\0" * header_size)
+        for grams in docs_grams:
+            buf = array.array("I")
+            for g in grams:
+                if type(g) is str:
+                    raise TypeError(f"grams must be lists of segments or id tuples, not strings: {g!r}")
+                buf.extend(encode(g))
+                gram_offsets.append(n_ids + len(buf))
+            buf.tofile(f)
+            n_ids += len(buf)
+            doc_offsets.append(len(gram_offsets) - 1)
+
+        ## offsets
+        pad_to(f)
+        gram_offsets.tofile(f)
+        doc_offsets.tofile(f)
+
+        ## vocabulary
+        V = [ seg.encode("utf-8") for seg in gen2_ngrams.invert_vocab(vocab) ]
+        vocab_offsets = array.array("q", [ 0 ])
+        for v in V:
+            vocab_offsets.append(vocab_offsets[-1] + len(v))
+        vocab_offsets.tofile(f)
+        f.write(b"".join(V))
+
+        ## header
+        byteorder = b"L" if sys.byteorder == "little" else b"B"
+        f.seek(0)
+        f.write(struct.pack(header_format, magic, byteorder, version, len(doc_offsets) - 1, len(gram_offsets) - 1, n_ids, len(V), vocab_offsets[-1]).ljust(header_size, b"\0"))
+
+    ##
+    return { "n_docs": len(doc_offsets) - 1, "n_grams": len(gram_offsets) - 1, "n_ids": n_ids, "n_vocab": len(V) }
+
+##
+class NgramStore:
+
+    """
+    a read-only view of a store file written by write_ngram_store(..), memory-mapped so that
+    documents are read on demand. store[i] gives the grams of document i as lists of segments,
+    store[i:j] those of a range of documents, and store.get_ids(i) the id tuples of document i.
+    """
+
+    def __init__(self, path: str, sep: str = None):
+        import mmap, sys
+        self.sep = sep
+        self.f = open(path, "rb")
+        self.mm = mmap.mmap(self.f.fileno(), 0, access = mmap.ACCESS_READ)
+        m, byteorder, v, self.n_docs, self.n_grams, self.n_ids, self.n_vocab, n_vocab_bytes = struct.unpack_from(header_format, self.mm, 0)
+        if m != magic or v != version:
+            raise ValueError(f"not an n-gram store of version {version}: {path}")
+        if byteorder != (b"L" if sys.byteorder == "little" else b"B"):
+            raise ValueError(f"byte order of {path} does not match this machine")
+
+        ## sections
+        mv = memoryview(self.mm)
+        pos = header_size
+        self.ids = mv[pos : pos + 4 * self.n_ids].cast("I")
+        pos += 4 * self.n_ids
+        pos += (8 - pos % 8) % 8
+        self.gram_offsets = mv[pos : pos + 8 * (self.n_grams + 1)].cast("q")
+        pos += 8 * (self.n_grams + 1)
+        self.doc_offsets = mv[pos : pos + 8 * (self.n_docs + 1)].cast("q")
+        pos += 8 * (self.n_docs + 1)
+        vocab_offsets = mv[pos : pos + 8 * (self.n_vocab + 1)].cast("q")
+        pos += 8 * (self.n_vocab + 1)
+        vocab_bytes = self.mm[pos : pos + n_vocab_bytes]
+        self.inverted_vocab = [ vocab_bytes[vocab_offsets[i] : vocab_offsets[i + 1]].decode("utf-8") for i in range(self.n_vocab) ]
+        vocab_offsets.release()
+
+    def __len__(self) -> int:
+        return self.n_docs
+
+    def get_ids(self, i: int) -> list:
+        """returns the grams of document i as tuples of ids"""
+        if i < 0:
+            i += self.n_docs
+        if not 0 <= i < self.n_docs:
+            raise IndexError(f"document index out of range: {i}")
+        go = self.gram_offsets
+        a, b = self.doc_offsets[i], self.doc_offsets[i + 1]
+        return [ tuple(self.ids[go[j] : go[j + 1]]) for j in range(a, b) ]
+
+    def get(self, i: int):
+        """returns the grams of document i, joined by sep if it is given"""
+        return [ gen2_ngrams.decode_ngram(ids, self.inverted_vocab, sep = self.sep or "", as_list = self.sep is None) for ids in self.get_ids(i) ]
+
+    def __getitem__(self, i):
+        if type(i) is slice:
+            return [ self.get(j) for j in range(*i.indices(self.n_docs)) ]
+        return self.get(i)
+
+    def __iter__(self):
+        for i in range(self.n_docs):
+            yield self.get(i)
+
+    def close(self):
+        for x in (self.ids, self.gram_offsets, self.doc_offsets):
+            x.release()
+        self.mm.close()
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+### end of file
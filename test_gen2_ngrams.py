@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+
+"""
+test_gen2_ngrams.py
+
+Regression tests of gen2_ngrams.py, run by pytest. gen_skippy_ngrams(..) is compared with the product lattice
+of release 1, which filter_segs(..) applies to itertools.product(..) of every substring, as the oracle.
+
+Creation
+2026/10/17
+"""
+
+import random
+
+import gen2_ngrams
+
+##
+def gen_skippy_ngrams_by_product(segs: list, n_for_ngram: int, max_gap_size: int, extended: bool = True, inclusive: bool = True, gap_mark: str = "…") -> list:
+
+    """
+    skippy n-grams of release 1 as lists of segments, for inputs of at least n_for_ngram segments
+    """
+
+    ## substrings in the order of gen_ngrams(.., inclusive = True)
+    n_segs = len(segs)
+    subsegs_pool = [ segs[i : i + k] for k in range(1, n_segs + 1) for i in range(n_segs - k + 1) ]
+    Q = [ ]
+    for p in gen2_ngrams.filter_segs(subsegs_pool, n_for_ngram, max_gap_size, extended = extended, inclusive = inclusive, gap_mark = gap_mark):
+        q = gen2_ngrams.simplify_gaps(p, gap_mark)
+        if not extended:
+            q = gen2_ngrams.drop_gap_at_end(q, gap_mark)
+        if q not in Q:
+            Q.append(q)
+    return [ q for q in Q if q + [ gap_mark ] not in Q and [ gap_mark ] + q not in Q ]
+
+##
+def test_gen_skippy_ngrams_against_product():
+    r = random.Random(1)
+    for _ in range(300):
+        segs = [ r.choice("abc") for _ in range(r.randrange(1, 10)) ]
+        n_for_ngram = r.randrange(1, len(segs) + 1)
+        max_gap_size = r.randrange(1, 9)
+        for extended in (True, False):
+            for inclusive in (True, False):
+                expected = gen_skippy_ngrams_by_product(segs, n_for_ngram, max_gap_size, extended = extended, inclusive = inclusive)
+                G = gen2_ngrams.gen_skippy_ngrams(segs, n_for_ngram, max_gap_size, extended = extended, inclusive = inclusive, as_list = True)
+                assert G == expected, (segs, n_for_ngram, max_gap_size, extended, inclusive)
+                assert gen2_ngrams.gen_skippy_ngrams(segs, n_for_ngram, max_gap_size, extended = extended, inclusive = inclusive) == [ " ".join(g) for g in expected ]
+
+##
+def test_corpus_with_blank_and_short_docs():
+    docs = [ "abcd", "", "a", "ab" ]
+    for n_jobs in (1, 2):
+        R = gen2_ngrams.gen_skippy_ngrams_corpus(docs, 3, 2, n_jobs = n_jobs)
+        assert R[0] == gen2_ngrams.gen_skippy_ngrams(list("abcd"), 3, 2)
+        assert R[1] == [ ]
+        assert R[3] == gen2_ngrams.gen_skippy_ngrams(list("ab"), 2, 2)
+
+##
+def test_count_corpus_with_blank_and_short_docs_and_spills():
+    r = random.Random(2)
+    docs = [ "".join( r.choice("abc") for _ in range(r.randrange(0, 7)) ) for _ in range(40) ] + [ "", "a" ]
+    ## counts of documents one by one, with short ones at their own length
+    expected = { }
+    for doc in docs:
+        for gram, c in gen2_ngrams.count_skippy_ngrams(list(doc), 3, 2).items():
+            tf, df = expected.get(gram, (0, 0))
+            expected[gram] = (tf + c, df + 1)
+    for max_items in (1000000, 5):
+        assert gen2_ngrams.count_skippy_ngrams_corpus(docs, 3, 2, max_items = max_items) == expected
+    assert gen2_ngrams.count_skippy_ngrams_corpus([ "", "ab" ], 2, 2) == { g: (c, 1) for g, c in gen2_ngrams.count_skippy_ngrams(list("ab"), 2, 2).items() }
+    assert gen2_ngrams.count_skippy_ngrams(list("a"), 3, 2) == gen2_ngrams.count_skippy_ngrams(list("a"), 1, 2)
+
+##
+class CountingSegmenter(gen2_ngrams.Segmenter):
+
+    """
+    a Segmenter that counts the documents it segments in a counter shared by worker processes
+    """
+
+    def __init__(self, counter):
+        super().__init__()
+        self.counter = counter
+
+    def __call__(self, t: str) -> list:
+        with self.counter.get_lock():
+            self.counter.value += 1
+        return super().__call__(t)
+
+##
+def test_corpus_budget_stops_sending_documents():
+    import multiprocessing
+    docs = [ "abcdef" ] * 400
+    serial = gen2_ngrams.GenBudget(max_corpus_output = 100)
+    expected = gen2_ngrams.gen_skippy_ngrams_corpus(docs, 3, 2, n_jobs = 1, budget = serial)
+    counter = multiprocessing.Value("i", 0)
+    budget = gen2_ngrams.GenBudget(max_corpus_output = 100)
+    R = gen2_ngrams.gen_skippy_ngrams_corpus(docs, 3, 2, pattern = CountingSegmenter(counter), n_jobs = 2, budget = budget)
+    assert R == expected
+    assert budget.totals["output"] == serial.totals["output"]
+    assert [ hit["doc"] for hit in budget.hits ] == [ hit["doc"] for hit in serial.hits ]
+    ## workers stop after the first batch rather than segmenting every document
+    assert 0 < counter.value < len(docs) // 4
+
+### end of file
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+
+"""
+test_ngram_mining.py
+
+Regression tests of ngram_mining.py, run by pytest. mine_skippy_ngrams(..) is compared with brute force,
+which counts the documents of every key of the templates of gen2_ngrams.iter_skippy_keys(..).
+
+Creation
+2026/10/17
+"""
+
+import random
+
+import gen2_ngrams
+import ngram_mining
+
+##
+def mine_by_brute_force(docs: list, max_n_for_ngram: int, min_support: int, max_gap_size: int = None, extended: bool = True, inclusive: bool = True, gap_mark: str = "…") -> dict:
+
+    """
+    returns the supports of mine_skippy_ngrams(..) from all templates of every document
+    """
+
+    S = { }
+    for doc in docs:
+        for key in set(gen2_ngrams.iter_skippy_keys(doc, max_n_for_ngram, max_gap_size, extended = extended, inclusive = True, gap_mark = gap_mark)):
+            S[key] = S.get(key, 0) + 1
+    R = { }
+    for key, c in S.items():
+        n_elements = len(key) - key.count(gap_mark)
+        if c >= min_support and (inclusive or n_elements == max_n_for_ngram):
+            R[" ".join(key)] = c
+    return R
+
+##
+def test_mine_skippy_ngrams_against_brute_force():
+    r = random.Random(1)
+    for _ in range(200):
+        docs = [ [ r.choice("abc") for _ in range(r.randrange(1, 9)) ] for _ in range(r.randrange(1, 6)) ]
+        max_n_for_ngram = r.randrange(1, 5)
+        min_support = r.randrange(1, 4)
+        max_gap_size = r.choice([ None, 0, 1, 2, 4 ])
+        for extended in (True, False):
+            for inclusive in (True, False):
+                expected = mine_by_brute_force(docs, max_n_for_ngram, min_support, max_gap_size, extended = extended, inclusive = inclusive)
+                R = ngram_mining.mine_skippy_ngrams(docs, max_n_for_ngram, min_support, max_gap_size = max_gap_size, extended = extended, inclusive = inclusive)
+                assert R == expected, (docs, max_n_for_ngram, min_support, max_gap_size, extended, inclusive)
+
+### end of file